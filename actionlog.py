@@ -0,0 +1,283 @@
+"""Game actions as typed commands, and a binary log to record and replay them.
+
+Every change the player (or a timer) makes to a GameState is a command:
+a small namedtuple with the game-clock time `now` plus the action's
+arguments, applied by apply(), the one reducer. A Recorder appends the
+commands of a session to a compact log, with checkpoints (a full save
+snapshot plus the state of every RNG stream) at the start, after loads and every
+CHECKPOINT_EVERY commands. replay() re-runs a log headlessly, as fast as
+the commands apply, and checks the state against each checkpoint.
+
+Log layout: magic, version, then records. A record is an opcode byte;
+checkpoints carry a flag byte and a length-prefixed save blob, commands
+the time since the previous record (in ms, zigzag varint) and their
+fields (varints, 0 for None). Times are kept to the millisecond, which is
+the resolution of the pygame clock.
+
+Usage: python actionlog.py SESSION_LOG [--no-verify]
+"""
+import struct
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+import savefile
+from engine import GameState
+from savefile import SaveError, _Reader, _put_uint, _put_int, _put_f64, _put_array
+
+
+MAGIC = b"CMAL"
+# 2: checkpoints hold the GameState's RandomStreams instead of the global RNG
+VERSION = 2
+# commands between verification checkpoints
+CHECKPOINT_EVERY = 2000
+
+_HEADER = struct.Struct("<4sH")
+_OP_CHECKPOINT = 0
+# checkpoint flags
+_RESET = 1
+
+
+class ReplayError(ValueError):
+	pass
+
+
+# --- commands ---
+
+COMMANDS = {}
+
+
+def _command(op, name, fields=()):
+	cls = namedtuple(name, ("now",) + fields)
+	cls.op = op
+	COMMANDS[op] = cls
+	return cls
+
+
+NewGame = _command(1, "NewGame")
+RestartRun = _command(2, "RestartRun")
+Prestige = _command(3, "Prestige")
+Deal = _command(4, "Deal")
+ToggleWorker = _command(5, "ToggleWorker")
+BuyCoin = _command(6, "BuyCoin", ("level",))
+BuySlot = _command(7, "BuySlot")
+BuyWorker = _command(8, "BuyWorker")
+BuyWorkerUpgrade = _command(9, "BuyWorkerUpgrade")
+BuyTimeThief = _command(10, "BuyTimeThief")
+Sell = _command(11, "Sell", ("slot", "count", "level"))
+SellHighestAtHalf = _command(12, "SellHighestAtHalf")
+TakeCoin = _command(13, "TakeCoin", ("slot",))
+DropCoin = _command(14, "DropCoin", ("level", "target", "src"))
+UpdatePrices = _command(15, "UpdatePrices")
+# timers (fired when due; only logged when they did something)
+MarketTick = _command(16, "MarketTick")
+WorkerTick = _command(17, "WorkerTick")
+
+_TIMERS = (MarketTick.op, WorkerTick.op)
+
+_REDUCERS = {
+	NewGame.op: lambda s, c: s.new_game(c.now),
+	RestartRun.op: lambda s, c: s.restart_run(),
+	Prestige.op: lambda s, c: s.prestige(),
+	Deal.op: lambda s, c: s.manual_deal(c.now),
+	ToggleWorker.op: lambda s, c: s.toggle_worker(c.now),
+	BuyCoin.op: lambda s, c: s.buy_coin(c.level, c.now),
+	BuySlot.op: lambda s, c: s.buy_slot(),
+	BuyWorker.op: lambda s, c: s.buy_worker(c.now),
+	BuyWorkerUpgrade.op: lambda s, c: s.buy_worker_upgrade(),
+	BuyTimeThief.op: lambda s, c: s.buy_time_thief(),
+	Sell.op: lambda s, c: s.sell(c.slot, c.now, count=c.count, level=c.level),
+	SellHighestAtHalf.op: lambda s, c: s.sell_highest_at_half(),
+	TakeCoin.op: lambda s, c: s.take_coin(c.slot),
+	DropCoin.op: lambda s, c: s.drop_coin(c.level, c.target, c.src),
+	UpdatePrices.op: lambda s, c: s.update_market_prices(c.now),
+	MarketTick.op: lambda s, c: s.tick_market(c.now),
+	WorkerTick.op: lambda s, c: s.worker_tick(c.now),
+}
+
+
+def apply(state, cmd):
+	"""Apply one command to `state` and return the action's result."""
+	return _REDUCERS[cmd.op](state, cmd)
+
+
+# --- RNG state ---
+
+def _put_rng_state(out, states):
+	# name -> random.Random state, for each stream of a RandomStreams
+	_put_uint(out, len(states))
+	for name, (version, words, gauss_next) in states.items():
+		raw = name.encode("utf-8")
+		_put_uint(out, len(raw))
+		out += raw
+		_put_uint(out, version)
+		_put_array(out, array("I", words))
+		out.append(gauss_next is not None)
+		if gauss_next is not None:
+			_put_f64(out, gauss_next)
+
+
+def _read_rng_state(r):
+	states = {}
+	for _ in range(r.uint()):
+		n = r.uint()
+		if r.pos + n > len(r.data):
+			raise SaveError("truncated session log")
+		name = bytes(r.data[r.pos:r.pos + n]).decode("utf-8")
+		r.pos += n
+		version = r.uint()
+		words = tuple(r.array("I"))
+		has_gauss = r.uint()
+		states[name] = (version, words, r.f64() if has_gauss else None)
+	return states
+
+
+# --- writing ---
+
+class Recorder:
+	"""Appends the commands applied to `state` to a session log at `path`."""
+
+	def __init__(self, state, path, checkpoint_every=CHECKPOINT_EVERY):
+		self.state = state
+		self.f = open(path, "wb")
+		self.f.write(_HEADER.pack(MAGIC, VERSION))
+		self.checkpoint_every = checkpoint_every
+		self.count = 0
+		self.last_ms = 0
+
+	def checkpoint(self, now, reset=True):
+		# reset: the state was replaced (loaded), so replay restores it instead of checking it
+		out = bytearray((_OP_CHECKPOINT, _RESET if reset else 0))
+		blob = savefile.encode(savefile.snapshot(self.state, now, time.time()))
+		_put_uint(out, len(blob))
+		out += blob
+		_put_rng_state(out, self.state.rng.getstate())
+		self.f.write(out)
+		self.last_ms = round(now * 1000)
+
+	def record(self, cmd, result=True):
+		if cmd.op in _TIMERS and not result:
+			return
+		ms = round(cmd.now * 1000)
+		out = bytearray((cmd.op,))
+		_put_int(out, ms - self.last_ms)
+		for value in cmd[1:]:
+			_put_uint(out, 0 if value is None else value + 1)
+		self.f.write(out)
+		self.last_ms = ms
+		self.count += 1
+		if self.count % self.checkpoint_every == 0:
+			self.checkpoint(cmd.now, reset=False)
+
+	def close(self):
+		self.f.close()
+
+
+# --- reading / replay ---
+
+Checkpoint = namedtuple("Checkpoint", "reset snap rng_state")
+
+
+def read_log(path):
+	"""Yield the Checkpoints and commands of a session log, in order.
+
+	A record cut off at the end (the game was killed mid-write) ends the log.
+	"""
+	with open(path, "rb") as f:
+		data = f.read()
+	if len(data) < _HEADER.size:
+		raise ReplayError("not a session log")
+	magic, version = _HEADER.unpack_from(data, 0)
+	if magic != MAGIC:
+		raise ReplayError("not a session log")
+	if version != VERSION:
+		raise ReplayError(f"unsupported session log version {version}")
+	r = _Reader(data)
+	r.pos = _HEADER.size
+	last_ms = 0
+	while r.pos < len(data):
+		op = data[r.pos]
+		r.pos += 1
+		try:
+			if op == _OP_CHECKPOINT:
+				flags = r.uint()
+				n = r.uint()
+				if r.pos + n > len(data):
+					return
+				snap = savefile.decode(data[r.pos:r.pos + n])
+				r.pos += n
+				record = Checkpoint(bool(flags & _RESET), snap, _read_rng_state(r))
+				last_ms = round(snap["clock"] * 1000)
+			else:
+				cls = COMMANDS.get(op)
+				if cls is None:
+					raise ReplayError(f"unknown command {op} at byte {r.pos - 1}")
+				last_ms += r.int()
+				args = [r.uint() for _ in range(len(cls._fields) - 1)]
+				record = cls(last_ms / 1000.0, *(None if v == 0 else v - 1 for v in args))
+		except SaveError:
+			return
+		yield record
+
+
+# compared at verification checkpoints
+_CHECKED = (
+	"slots", "unlocked_slots", "currency", "prestige_level", "worker_owned", "worker_enabled",
+	"worker_upgraded", "time_thief_count", "last_deal_time", "worker_last_deal_time", "current_prices",
+)
+
+
+def replay(path, state=None, verify=True):
+	"""Re-run a session log on `state` (a new GameState by default).
+
+	Returns (state, stats). With `verify`, raises ReplayError at the first
+	checkpoint the replayed state doesn't match.
+	"""
+	state = GameState() if state is None else state
+	stats = {"commands": 0, "checkpoints": 0, "start": None, "end": None}
+	started = False
+	for record in read_log(path):
+		if isinstance(record, Checkpoint):
+			stats["checkpoints"] += 1
+			clock = record.snap["clock"]
+			if record.reset or not started:
+				savefile.restore(state, record.snap, clock)
+				state.rng.setstate(record.rng_state)
+				started = True
+			elif verify:
+				snap = savefile.snapshot(state, clock, record.snap["wall_time"])
+				for key in _CHECKED:
+					if snap[key] != record.snap[key]:
+						raise ReplayError(f"replay diverged before command {stats['commands']}: {key} differs")
+				if state.rng.getstate() != record.rng_state:
+					raise ReplayError(f"replay diverged before command {stats['commands']}: RNG state differs")
+			if stats["start"] is None:
+				stats["start"] = clock
+			stats["end"] = clock
+			continue
+		if not started:
+			raise ReplayError("session log doesn't start with a checkpoint")
+		apply(state, record)
+		stats["commands"] += 1
+		stats["end"] = record.now
+	return state, stats
+
+
+def main(argv):
+	args = [a for a in argv if not a.startswith("--")]
+	if len(args) != 1:
+		print(__doc__.strip().splitlines()[-1])
+		return 2
+	t0 = time.perf_counter()
+	state, stats = replay(args[0], verify="--no-verify" not in argv)
+	elapsed = time.perf_counter() - t0
+	played = (stats["end"] or 0.0) - (stats["start"] or 0.0)
+	print(f"{stats['commands']} commands, {stats['checkpoints']} checkpoints")
+	print(f"replayed {played:.1f} s of play in {elapsed:.3f} s ({played / max(elapsed, 1e-9):.0f}x real time)")
+	print(f"currency {state.currency}, prestige {state.prestige_level}, top coin C{state.current_max()}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,233 @@
+"""Monte-Carlo balance explorer: sweep engine constants over headless playthroughs.
+
+Every point of the parameter grid is played RUNS times by a simple greedy
+agent (see Agent) on a Simulator, spread over a process pool. For each
+point it reports the time until the agent prestiges (once it has unlocked
+--prestige-slots slots) and the currency it earns per minute. Results are
+cached in .balance-cache/ under a hash of everything that affects them,
+so re-running a sweep only plays the new points. A swept parameter whose
+values all give identical results is flagged: the agent never reached
+what it changes, so the sweep measured nothing.
+
+Example:
+  python balance.py --set WORKER_COST=500,1000,2000 --set DEAL_WEIGHT_DECAY=1.5,2 --runs 32
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+from engine import Simulator, INITIAL_SLOTS, coin_value
+
+
+# engine constants that can be swept
+TUNABLE = (
+	"SLOT_CAPACITY", "WORKER_COST", "TIME_THIEF_COST", "TIME_THIEF_REDUCTION",
+	"DEAL_WEIGHT_DECAY", "MAX_SLOTS", "SLOT_BASE_COST", "SLOT_COST_GROWTH",
+)
+DEFAULTS = {name: getattr(engine, name) for name in TUNABLE}
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".balance-cache")
+# bump when the agent's play changes, so cached results are not reused
+AGENT_VERSION = 2
+
+
+class Agent:
+	"""Greedy player used for the playthroughs.
+
+	Every time the manual deal is ready it: prestiges once `target_slots`
+	slots are unlocked, buys what it can afford (slot, then Time Thief, then
+	the worker, then its upgrade), sells every stack of level `sell_from` or
+	above while the market pays at least `min_price` of the coin's base
+	value, gets itself out of a stuck board like the no-moves popup would,
+	and deals. The worker blocks manual deals, so it is only switched on
+	while it deals at least as often as the agent would (with the upgrade);
+	a plain worker is bought on the way there and left off.
+	"""
+
+	def __init__(self, sim, target_slots, sell_from=3, min_price=0.5):
+		self.sim = sim
+		self.target_slots = target_slots
+		self.sell_from = sell_from
+		self.min_price = min_price
+		self.earned = 0
+
+	def step(self):
+		# returns True once the agent prestiged
+		sim = self.sim
+		state = sim.state
+		if state.unlocked_slots >= self.target_slots:
+			return state.prestige()
+		while state.buy_slot():
+			state.update_market_prices(sim.now)
+		while state.buy_time_thief():
+			pass
+		if not state.worker_owned:
+			state.buy_worker(sim.now)
+		if state.worker_owned and not state.worker_upgraded:
+			state.buy_worker_upgrade()
+		pays = state.worker_interval() <= state.effective_deal_cooldown()
+		if state.worker_owned and state.worker_enabled != pays:
+			state.toggle_worker(sim.now)
+		for i, s in enumerate(state.slots):
+			if s.coin >= self.sell_from and state.price_of(s.coin) >= self.min_price * coin_value(s.coin):
+				before = state.currency
+				state.sell(i, sim.now)
+				self.earned += state.currency - before
+		if state.no_moves():
+			before = state.currency
+			if not state.sell_highest_at_half():
+				state.restart_run()
+			self.earned += max(0, state.currency - before)
+		if not state.worker_enabled:
+			sim.deal()
+		return False
+
+	def wait(self):
+		# time until the manual deal (or, with the worker on, its next deal) is ready
+		state = self.sim.state
+		if state.worker_enabled:
+			ready = state.worker_last_deal_time + state.worker_interval()
+		else:
+			ready = state.last_deal_time + state.effective_deal_cooldown()
+		return max(self.sim.dt, ready - self.sim.now)
+
+
+def apply_params(params):
+	# set the engine constants of one grid point (unset ones go back to their defaults)
+	for name in TUNABLE:
+		setattr(engine, name, params.get(name, DEFAULTS[name]))
+
+
+def playthrough(params, seed, horizon, target_slots):
+	"""Play one game for up to `horizon` seconds; returns (time to prestige or None, currency per minute)."""
+	apply_params(params)
+	sim = Simulator(seed=seed)
+	agent = Agent(sim, min(target_slots, engine.MAX_SLOTS))
+	prestiged_at = None
+	while sim.now < horizon:
+		if agent.step():
+			prestiged_at = sim.now
+			break
+		sim.run(agent.wait())
+	minutes = max(sim.now, sim.dt) / 60.0
+	return prestiged_at, agent.earned / minutes
+
+
+def point_key(params, args):
+	blob = json.dumps({
+		"params": {name: params.get(name, DEFAULTS[name]) for name in TUNABLE},
+		"runs": args.runs, "horizon": args.horizon, "seed": args.seed,
+		"target": args.prestige_slots, "agent": AGENT_VERSION,
+	}, sort_keys=True)
+	return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:20]
+
+
+def summarize(results):
+	times = sorted(t for t, _ in results if t is not None)
+	rates = sorted(r for _, r in results)
+	summary = {"runs": len(results), "prestiged": len(times)}
+	for name, values in (("time_to_prestige", times), ("currency_rate", rates)):
+		if len(values) >= 2:
+			q = statistics.quantiles(values, n=10, method="inclusive")
+			summary[name] = {"p10": q[0], "p50": statistics.median(values), "p90": q[-1], "mean": statistics.fmean(values)}
+		elif values:
+			summary[name] = {"p10": values[0], "p50": values[0], "p90": values[0], "mean": values[0]}
+		else:
+			summary[name] = None
+	return summary
+
+
+def _number(text):
+	try:
+		return int(text)
+	except ValueError:
+		return float(text)
+
+
+def parse_grid(specs):
+	# ["NAME=v1,v2", ...] -> list of {NAME: value} points (cartesian product)
+	axes = []
+	for spec in specs:
+		name, _, values = spec.partition("=")
+		name = name.strip().upper()
+		if name not in TUNABLE:
+			raise SystemExit(f"unknown parameter {name} (one of: {', '.join(TUNABLE)})")
+		try:
+			axes.append([(name, _number(v)) for v in values.split(",") if v.strip()])
+		except ValueError:
+			raise SystemExit(f"bad value in {spec!r}")
+	return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def inert_parameters(points, summaries):
+	# swept parameters whose every value gave the same results, with the others held fixed
+	inert = []
+	for name in points[0] if points else ():
+		if len({p[name] for p in points}) < 2:
+			continue
+		groups = {}
+		for i, p in enumerate(points):
+			rest = tuple((k, v) for k, v in p.items() if k != name)
+			groups.setdefault(rest, set()).add(json.dumps(summaries[i], sort_keys=True))
+		if all(len(results) == 1 for results in groups.values()):
+			inert.append(name)
+	return inert
+
+
+def _fmt(stats, unit):
+	if stats is None:
+		return "-"
+	return f"{stats['p10']:.0f}/{stats['p50']:.0f}/{stats['p90']:.0f}{unit}"
+
+
+def main(argv):
+	p = argparse.ArgumentParser(description="Sweep engine constants over headless playthroughs.")
+	p.add_argument("--set", action="append", default=[], metavar="NAME=V1,V2", help="parameter values to sweep (repeatable)")
+	p.add_argument("--runs", type=int, default=16, help="playthroughs per grid point")
+	p.add_argument("--horizon", type=float, default=3600.0, help="game seconds per playthrough")
+	p.add_argument("--prestige-slots", type=int, default=INITIAL_SLOTS + 5, help="unlocked slots at which the agent prestiges")
+	p.add_argument("--seed", default="0", help="base seed (run i of every point uses <seed>/<i>)")
+	p.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+	p.add_argument("--no-cache", action="store_true", help="ignore cached results")
+	args = p.parse_args(argv)
+
+	points = parse_grid(args.set)
+	os.makedirs(CACHE_DIR, exist_ok=True)
+	summaries = {}
+	todo = []
+	for i, params in enumerate(points):
+		path = os.path.join(CACHE_DIR, point_key(params, args) + ".json")
+		if not args.no_cache and os.path.exists(path):
+			with open(path) as f:
+				summaries[i] = json.load(f)
+		else:
+			todo.append((i, path))
+
+	if todo:
+		with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+			futures = {
+				i: [pool.submit(playthrough, points[i], f"{args.seed}/{run}", args.horizon, args.prestige_slots) for run in range(args.runs)]
+				for i, _ in todo
+			}
+			for i, path in todo:
+				summaries[i] = summarize([f.result() for f in futures[i]])
+				with open(path, "w") as f:
+					json.dump(summaries[i], f)
+
+	print(f"{len(points)} points x {args.runs} runs ({len(points) - len(todo)} cached); time to prestige and currency/min as p10/p50/p90")
+	for i, params in enumerate(points):
+		s = summaries[i]
+		label = " ".join(f"{k}={v}" for k, v in params.items()) or "defaults"
+		print(f"{label:48} prestiged {s['prestiged']:>3}/{s['runs']:<3} time {_fmt(s['time_to_prestige'], ' s'):>18}  rate {_fmt(s['currency_rate'], '/min'):>20}")
+	for name in inert_parameters(points, summaries):
+		print(f"warning: every value of {name} gave identical results; the agent never reaches what it changes")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
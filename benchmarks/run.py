@@ -0,0 +1,359 @@
+"""Benchmarks for the game-logic hot paths.
+
+Each case reports the best (lowest) mean time per call over several
+rounds, the least noisy estimate on a busy machine, and how far the
+lower-quartile round was above it (the case's noise). Rounds of a fixed
+pure-Python calibration loop alternate with the case's, and cases are
+compared with baseline.json in units of that loop, so a machine that is
+slower or busier than the one the baseline was recorded on does not
+show up as a regression.
+
+A case is flagged when it is slower than the baseline by more than
+--threshold or by three times the noise seen now or at recording,
+whichever is larger, but never by more than NOISE_LIMIT: a 1.5x slowdown
+is always caught. Flagged cases are measured again (--retries) and only
+reported if their best attempt stays over the limit. --save-baseline
+re-measures cases noisier than BASELINE_MAX_SPREAD (with more rounds)
+and refuses to write a baseline if some stay that noisy.
+
+Usage:
+  python benchmarks/run.py                  # run and compare with the baseline
+  python benchmarks/run.py -k market        # only cases whose name contains "market"
+  python benchmarks/run.py --save-baseline  # record a new baseline.json
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import engine
+from engine import (
+	Slot, GameState, MarketLevel, MARKET_HISTORY_LEN, SLOT_CAPACITY,
+	add_coin_to_slots, process_combines, weighted_random_coin, compute_spawn_probabilities, slot_index,
+)
+
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+# the most a case's noise can widen its limit (beyond --threshold)
+NOISE_LIMIT = 0.5
+# the noisiest a case may be when recorded into the baseline
+BASELINE_MAX_SPREAD = 0.10
+
+CASES = {}
+
+
+def case(name):
+	# register `factory`: returns fn, or (fn, setup) where setup() makes fn's argument untimed.
+	# Arguments are made a batch at a time, so each must stand on its own.
+	def register(factory):
+		CASES[name] = factory
+		return factory
+	return register
+
+
+def measure(fn, setup=None, rounds=7, min_time=0.1):
+	"""(ns, calibration ns, spread) for one case.
+
+	Rounds of the case (each at least `min_time` seconds) alternate with
+	rounds of the calibration loop, so both see the same machine. ns and
+	calibration ns are the best round means per call; spread is the larger
+	(lower quartile - best) / best of the two, the jitter between the fast
+	rounds (the slow ones just met a busy machine).
+	"""
+	# like timeit: a collection triggered by earlier cases' garbage is not the case's cost
+	gc.collect()
+	gc.disable()
+	try:
+		case = []
+		calib = [_round(calibration, None, min_time / 2)]
+		for _ in range(rounds):
+			case.append(_round(fn, setup, min_time))
+			calib.append(_round(calibration, None, min_time / 2))
+	finally:
+		gc.enable()
+	ns, spread = _best(case)
+	calib_ns, calib_spread = _best(calib)
+	return ns, calib_ns, max(spread, calib_spread)
+
+
+def _best(results):
+	results = sorted(results)
+	best = results[0]
+	return best, (results[len(results) // 4] - best) / best
+
+
+def _round(fn, setup, min_time):
+	# mean nanoseconds per call over at least `min_time` seconds
+	clock = time.perf_counter_ns
+	calls = 0
+	spent = 0
+	started = clock()
+	while clock() - started < min_time * 1e9:
+		if setup is None:
+			t0 = clock()
+			for _ in range(100):
+				fn()
+			spent += clock() - t0
+			calls += 100
+		else:
+			args = [setup() for _ in range(100)]
+			t0 = clock()
+			for arg in args:
+				fn(arg)
+			spent += clock() - t0
+			calls += 100
+	return spent / calls
+
+
+def calibration():
+	# fixed interpreter work (loops, dict and list ops, float math): the yardstick
+	d = {}
+	for i in range(200):
+		d[i % 17] = d.get(i % 17, 0.0) + i * 0.5
+	return sorted(d.values())
+
+
+def machine_info():
+	return {
+		"python": platform.python_version(),
+		"implementation": platform.python_implementation(),
+		"compiler": platform.python_compiler(),
+		"platform": platform.platform(),
+		"machine": platform.machine(),
+		"processor": platform.processor() or _cpu_model(),
+		"cpus": os.cpu_count(),
+	}
+
+
+def _cpu_model():
+	try:
+		with open("/proc/cpuinfo") as f:
+			for line in f:
+				if line.startswith("model name"):
+					return line.split(":", 1)[1].strip()
+	except OSError:
+		pass
+	return ""
+
+
+# --- boards ---
+
+def make_slots(n, levels=(1, 2, 3), count=5):
+	# n slots, cycling through `levels`, `count` coins each
+	slots = [Slot() for _ in range(n)]
+	for i, s in enumerate(slots):
+		s.coin = levels[i % len(levels)]
+		s.count = count
+	slot_index(slots)
+	return slots
+
+
+def make_state(n_slots, seed=1):
+	state = GameState(seed)
+	state.slots = make_slots(n_slots, levels=tuple(range(1, n_slots // 2 + 2)), count=4)
+	state.unlocked_slots = n_slots
+	state.currency = 10 ** 6
+	state.worker_owned = state.worker_enabled = True
+	return state
+
+
+# --- cases ---
+
+@case("process_combines_cascade_18")
+def _():
+	# C1..C17 stacks one short of full, then a full C1 stack: promotes all the way up
+	def setup():
+		slots = make_slots(18, levels=tuple(range(1, 19)), count=SLOT_CAPACITY - 1)
+		slots[0].count = SLOT_CAPACITY
+		return slots
+	return (lambda slots: process_combines(slots, 0, 1.0)), setup
+
+
+@case("add_coin_to_slots_12")
+def _():
+	def setup():
+		slots = make_slots(12, levels=(3, 4, 5, 6), count=SLOT_CAPACITY - 1)
+		slots[10].coin = slots[10].count = 0
+		return slots
+	return (lambda slots: add_coin_to_slots(slots, 2)), setup
+
+
+@case("weighted_random_coin_12")
+def _():
+	slots = make_slots(12, levels=(1, 2, 3, 4, 5, 6))
+	rng = random.Random(1)
+	return lambda: weighted_random_coin(slots, cap=14, rng=rng)
+
+
+@case("compute_spawn_probabilities_12_cold")
+def _():
+	# a fresh board has an empty spawn cache
+	def setup():
+		return make_slots(12, levels=(1, 2, 3, 4, 5, 6))
+	return (lambda slots: compute_spawn_probabilities(slots, cap=14)), setup
+
+
+@case("compute_spawn_probabilities_12_warm")
+def _():
+	slots = make_slots(12, levels=(1, 2, 3, 4, 5, 6))
+	return lambda: compute_spawn_probabilities(slots, cap=14)
+
+
+@case("update_market_prices_full_history")
+def _():
+	# 12 levels, each with a full ring of MARKET_HISTORY_LEN recent sales
+	state = make_state(12)
+	rng = random.Random(2)
+	now = 1000.0
+	for lvl in range(1, 13):
+		market = state.market_sales[lvl] = MarketLevel()
+		for i in range(MARKET_HISTORY_LEN):
+			market.add(engine.coin_value(lvl) * rng.uniform(0.5, 1.5), now - 60.0 + i * 0.06, rng.randint(1, 5) * 5)
+	state.update_market_prices(now)
+	return lambda: state.update_market_prices(now)
+
+
+def _bitmap_text():
+	import game
+	return game
+
+
+@case("render_bitmap_text_cold")
+def _():
+	game = _bitmap_text()
+	# a string never rendered before misses the text cache
+	fresh = itertools.count(100000000)
+
+	def setup():
+		return f"CURRENCY: {next(fresh)}"
+	return (lambda text: game.render_bitmap_text(text, (230, 220, 200))), setup
+
+
+@case("render_bitmap_text_warm")
+def _():
+	game = _bitmap_text()
+	return lambda: game.render_bitmap_text("CURRENCY: 123456789", (230, 220, 200))
+
+
+def _frame_case(n_slots):
+	# the engine work of one game.py frame: derived UI values, timers, spawn odds.
+	# Layout, dirty-rect tracking, text and drawing are not included.
+	# The same 10 s of play repeat, so every round sees the same mix of frames.
+	run = {"state": None, "now": 10.0}
+
+	def frame():
+		if run["now"] >= 10.0:
+			run["state"] = make_state(n_slots)
+			run["now"] = 0.0
+		run["now"] += 1.0 / 60.0
+		state = run["state"]
+		now = run["now"]
+		state.highest_purchasable()
+		state.buy_levels()
+		state.slot_cost()
+		state.no_moves()
+		state.tick(now)
+		state.supply()
+		compute_spawn_probabilities(state.slots, cap=state.deal_cap())
+	return frame
+
+
+for _n in (5, 12, 18):
+	case(f"engine_frame_{_n}")(lambda n=_n: _frame_case(n))
+
+
+# --- runner ---
+
+def main(argv):
+	p = argparse.ArgumentParser(description="Benchmark the game-logic hot paths.")
+	p.add_argument("-k", default="", help="only run cases whose name contains this")
+	p.add_argument("--save-baseline", action="store_true", help="write the results to baseline.json")
+	p.add_argument("--threshold", type=float, default=0.20, help="flag cases at least this much slower than the baseline")
+	p.add_argument("--retries", type=int, default=2, help="re-measure a flagged case up to this many times")
+	args = p.parse_args(argv)
+
+	baseline = {}
+	if os.path.exists(BASELINE_PATH):
+		with open(BASELINE_PATH) as f:
+			baseline = json.load(f)
+		info = machine_info()
+		if "machine_info" not in baseline:
+			print("note: baseline.json has no calibrated results; record a new one with --save-baseline")
+		elif any(baseline.get("machine_info", {}).get(k) != info[k] for k in ("python", "implementation", "machine")):
+			print("note: baseline recorded with a different interpreter or machine:", baseline.get("machine_info"))
+	results = {}
+	regressions = []
+	noisy = []
+	for name, factory in CASES.items():
+		if args.k not in name:
+			continue
+		made = factory()
+		fn, setup = made if isinstance(made, tuple) else (made, None)
+		base = baseline.get("results", {}).get(name)
+		tries = 0
+		best = None
+		while True:
+			# keep the fastest attempt
+			measured = measure(fn, setup)
+			if best is None or measured[0] / measured[1] < best[0] / best[1]:
+				best = measured
+			ns, calib, spread = best
+			relative = ns / calib
+			if not isinstance(base, dict):
+				break
+			ratio = relative / base["relative"]
+			limit = 1.0 + max(args.threshold, min(3.0 * max(spread, base["spread"]), NOISE_LIMIT))
+			if ratio <= limit or tries >= args.retries:
+				break
+			tries += 1
+		if args.save_baseline:
+			# a baseline is only as good as its noise: measure again, with more rounds, until it is quiet
+			attempts = 0
+			while spread > BASELINE_MAX_SPREAD and attempts < 2 + 2 * args.retries:
+				attempts += 1
+				measured = measure(fn, setup, rounds=14)
+				if measured[2] < spread:
+					ns, calib, spread = measured
+					relative = ns / calib
+			if spread > BASELINE_MAX_SPREAD:
+				noisy.append(name)
+		results[name] = {"ns": round(ns, 1), "relative": float(f"{relative:.4g}"), "spread": round(spread, 3)}
+		line = f"{name:40} {ns / 1000.0:12.2f} us {relative:10.4f} cal  +-{spread:4.0%}"
+		if isinstance(base, dict):
+			line += f"   {ratio:5.2f}x baseline (limit {limit:.2f}x)"
+			if ratio > limit:
+				line += "  SLOWER"
+				regressions.append(name)
+		print(line)
+
+	if args.save_baseline:
+		if noisy:
+			print(f"baseline not written: {', '.join(noisy)} stayed noisier than {BASELINE_MAX_SPREAD:.0%}; "
+				"re-run on a quieter machine")
+			return 1
+		with open(BASELINE_PATH, "w") as f:
+			json.dump({
+				"machine_info": machine_info(),
+				"unit": "ns: ns per call (best round mean); relative: ns / calibration loop ns; "
+					"spread: (lower quartile - best) / best over the rounds",
+				"results": results,
+			}, f, indent=1, sort_keys=True)
+			f.write("\n")
+		print(f"baseline written to {BASELINE_PATH}")
+	elif regressions:
+		print(f"{len(regressions)} case(s) slower than the baseline beyond their noise limit")
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,1399 @@
+"""Headless game engine for Combine Them!
+
+The game rules and all mutable game state live here, with no pygame
+dependency, so deals, combines and sales can be run in bulk (balance
+sweeps, regression runs on machines without SDL). game.py drives a
+GameState from the pygame UI; Simulator drives one from a simulated clock.
+"""
+import heapq
+import math
+import random
+from array import array
+from bisect import bisect, bisect_left
+from itertools import accumulate
+from operator import mul
+
+
+SLOT_CAPACITY = 10
+INITIAL_SLOTS = 5
+INITIAL_CURRENCY = 2500
+WORKER_COST = 1000
+TIME_THIEF_COST = 500
+TIME_THIEF_REDUCTION = 0.25  # seconds reduced per Time Thief purchased
+# base manual deal cooldown (seconds)
+DEAL_COOLDOWN = 5.0
+# minimum possible manual deal cooldown (player-controlled)
+MIN_DEAL_COOLDOWN = 0.25
+# Worker upgrade cost: after max Time Thiefs, buy to make worker use same cooldown as manual
+WORKER_UPGRADE_COST = 7500
+DEAL_WEIGHT_DECAY = 2.0  # decay factor for deal weighting: higher -> stronger bias to small coins
+# game limits
+MAX_SLOTS = 18
+# slot prices: SLOT_BASE_COST * SLOT_COST_GROWTH ** (slots bought so far)
+SLOT_BASE_COST = 200
+SLOT_COST_GROWTH = 2
+# prestige is allowed once a slot was bought or this much currency is held
+PRESTIGE_MIN_CURRENCY = 1000
+# how strongly player sales affect market history (higher -> bigger immediate impact)
+SELL_IMPACT_MULTIPLIER = 5
+# recent sales kept per level for pricing (one record per sale, whatever its size)
+MARKET_HISTORY_LEN = 1000
+# base price is the mean of (at most) this many of the latest weighted sale units...
+MARKET_PRICE_SAMPLES = 100
+# ...made within 2x this window; sales inside the window itself lower demand
+MARKET_LOOKBACK = 30.0
+# levels nobody holds and nobody sold for this long leave the chart (their sales still set prices)
+MARKET_IDLE_EVICT = 120.0
+# most worker deals made for the time the game was closed: a deliberate cap on
+# offline play (the catch-up is simulated coin by coin, so it also bounds the load time)
+OFFLINE_MAX_DEALS = 10000
+
+
+class RandomStreams:
+	"""Independent random streams, one per subsystem, all derived from one seed.
+
+	Each stream is seeded from "<seed>/<name>", so deals don't depend on how
+	many price updates happened before them. fork(i) derives another
+	independent set (e.g. one per worker process of a batch run).
+	"""
+
+	NAMES = ("spawn", "market")
+
+	def __init__(self, seed=None):
+		if seed is None:
+			seed = random.SystemRandom().getrandbits(64)
+		self.seed = seed
+		for name in self.NAMES:
+			setattr(self, name, random.Random(f"{seed}/{name}"))
+
+	def fork(self, index):
+		return RandomStreams(f"{self.seed}/{index}")
+
+	def getstate(self):
+		return {name: getattr(self, name).getstate() for name in self.NAMES}
+
+	def setstate(self, states):
+		for name, st in states.items():
+			getattr(self, name).setstate(st)
+
+
+class Slot:
+	__slots__ = ("_coin", "_count", "_index", "_pos")
+
+	def __init__(self):
+		self._index = None  # SlotIndex this slot reports changes to (set by SlotIndex)
+		self._pos = 0
+		self._coin = 0  # 0 means empty, otherwise coin level (1,2,...)
+		self._count = 0
+
+	@property
+	def coin(self):
+		return self._coin
+
+	@coin.setter
+	def coin(self, value):
+		index = self._index
+		if index is not None and value != self._coin:
+			index._remove(self)
+			self._coin = value
+			index._add(self)
+		else:
+			self._coin = value
+
+	@property
+	def count(self):
+		return self._count
+
+	@count.setter
+	def count(self, value):
+		index = self._index
+		if index is not None:
+			index._set_count(self, value)
+		else:
+			self._count = value
+
+	def is_empty(self):
+		return self._coin == 0
+
+
+def _lowest_bit(mask):
+	# position of the lowest set bit (mask must be non-zero)
+	return (mask & -mask).bit_length() - 1
+
+
+class SlotIndex:
+	"""Occupancy index over a list of slots, kept in sync by Slot's setters.
+
+	Each level maps to a bitmask of slot positions (all slots holding it and
+	the ones with room), plus masks of empty and over-capacity slots, so
+	"first slot with room for level" and "first empty slot" are a couple of
+	integer operations instead of a scan. Use slot_index(slots) to get one.
+
+	`version` changes whenever the set of held levels, the set of levels
+	with room or the presence of an empty slot changes; caches derived from
+	placement (see spawn_distribution) are keyed on it. `changes` counts
+	every coin/count change, for caches that also depend on the counts
+	(see DerivedState).
+	"""
+
+	def __init__(self, slots):
+		self.slots = slots
+		self.size = len(slots)
+		self.level_mask = {}  # level -> slots holding that level
+		self.open_mask = {}  # level -> slots holding that level with room left
+		self.empty_mask = 0
+		self.full_mask = 0  # non-empty slots at or over capacity (waiting to combine)
+		self.level_count = {}  # level -> coins held at that level
+		self.max_level = 0
+		self.version = 0
+		self.changes = 0
+		self.spawn_cache = {}  # cap -> (version, SpawnDistribution)
+		for i, s in enumerate(slots):
+			s._index = self
+			s._pos = i
+			self._add(s)
+
+	def _add(self, s):
+		bit = 1 << s._pos
+		level = s._coin
+		self.changes += 1
+		if level == 0:
+			if not self.empty_mask:
+				self.version += 1
+			self.empty_mask |= bit
+			return
+		if level in self.level_mask:
+			self.level_mask[level] |= bit
+			self.level_count[level] += s._count
+		else:
+			self.level_mask[level] = bit
+			self.level_count[level] = s._count
+			if level > self.max_level:
+				self.max_level = level
+			self.version += 1
+		if s._count < SLOT_CAPACITY:
+			self._open(level, bit)
+		else:
+			self.full_mask |= bit
+
+	def _remove(self, s):
+		bit = 1 << s._pos
+		level = s._coin
+		self.changes += 1
+		if level == 0:
+			self.empty_mask &= ~bit
+			if not self.empty_mask:
+				self.version += 1
+			return
+		mask = self.level_mask[level] & ~bit
+		if mask:
+			self.level_mask[level] = mask
+			self.level_count[level] -= s._count
+		else:
+			del self.level_mask[level]
+			del self.level_count[level]
+			if level == self.max_level:
+				self.max_level = max(self.level_mask, default=0)
+			self.version += 1
+		if s._count < SLOT_CAPACITY:
+			self._close(level, bit)
+		else:
+			self.full_mask &= ~bit
+
+	def _open(self, level, bit):
+		if level in self.open_mask:
+			self.open_mask[level] |= bit
+		else:
+			self.open_mask[level] = bit
+			self.version += 1
+
+	def _close(self, level, bit):
+		mask = self.open_mask[level] & ~bit
+		if mask:
+			self.open_mask[level] = mask
+		else:
+			del self.open_mask[level]
+			self.version += 1
+
+	def _set_count(self, s, count):
+		level = s._coin
+		self.changes += 1
+		if level:
+			self.level_count[level] += count - s._count
+		# for placement, a count change only matters when the slot crosses capacity
+		was_open = s._count < SLOT_CAPACITY
+		s._count = count
+		if level == 0 or was_open == (count < SLOT_CAPACITY):
+			return
+		bit = 1 << s._pos
+		if was_open:
+			self._close(level, bit)
+			self.full_mask |= bit
+		else:
+			self.full_mask &= ~bit
+			self._open(level, bit)
+
+	def first_open(self, level):
+		# first slot holding `level` with room left, or None
+		mask = self.open_mask.get(level)
+		return _lowest_bit(mask) if mask else None
+
+	def first_empty(self):
+		return _lowest_bit(self.empty_mask) if self.empty_mask else None
+
+	def can_place(self, level):
+		# same-level slot with room or any empty slot
+		return bool(self.empty_mask) or level in self.open_mask
+
+	def any_place_up_to(self, max_level):
+		if self.empty_mask:
+			return True
+		for level in self.open_mask:
+			if level <= max_level:
+				return True
+		return False
+
+	def levels(self):
+		# levels currently held in any slot
+		return self.level_mask.keys()
+
+
+def slot_index(slots):
+	"""Return the SlotIndex for `slots`, building it on first use.
+
+	The index follows every coin/count change through the Slot setters;
+	it is rebuilt when the list itself was replaced or grew.
+	"""
+	if slots:
+		index = slots[0]._index
+		if index is not None and index.slots is slots and index.size == len(slots):
+			return index
+	return SlotIndex(slots)
+
+
+def coin_value(level):
+	# base value for a combined coin of given level
+	return 10 * (2 ** (level - 1))
+
+
+def slot_cost(unlocked_slots):
+	# make slots more expensive (higher base)
+	return int(SLOT_BASE_COST * (SLOT_COST_GROWTH ** (unlocked_slots - INITIAL_SLOTS)))
+
+
+def add_coin_to_slots(slots, level):
+	# place a single coin of `level` into the first available slot
+	# prefer same-level slots with space, else empty slots
+	index = slot_index(slots)
+	i = index.first_open(level)
+	if i is not None:
+		slots[i].count += 1
+		return True
+	i = index.first_empty()
+	if i is not None:
+		s = slots[i]
+		s.coin = level
+		s.count = 1
+		return True
+	return False
+
+
+def process_combines(slots, currency, prestige_mult):
+	"""Promote every full slot into coins of the next level, cascading until stable.
+
+	Results match a repeat-until-stable scan over all slots (earlier slots
+	first, each pass picking up slots that filled up behind the current one),
+	but only over-capacity slots are visited and each slot's promotions are
+	placed in bulk: same-level slots with room first, then empty slots, both
+	in slot order.
+	"""
+	index = slot_index(slots)
+	if not index.full_mask:
+		return currency, 0
+	gained = 0
+
+	def _place(level, k):
+		# place up to k coins of `level`; returns how many could not be placed
+		while k:
+			j = index.first_open(level)
+			if j is not None:
+				t = slots[j]
+				take = min(k, SLOT_CAPACITY - t.count)
+				t.count += take
+			else:
+				j = index.first_empty()
+				if j is None:
+					break
+				t = slots[j]
+				take = min(k, SLOT_CAPACITY)
+				t.coin = level
+				t.count = take
+			k -= take
+		return k
+
+	pos = -1
+	while index.full_mask:
+		# next full slot ahead of the scan position; wrap around for another pass
+		ahead = (index.full_mask >> (pos + 1)) << (pos + 1)
+		if not ahead:
+			pos = -1
+			continue
+		pos = _lowest_bit(ahead)
+		s = slots[pos]
+		promos = s.count // SLOT_CAPACITY
+		s.count = s.count % SLOT_CAPACITY
+		# create `promos` coins of level s.coin+1
+		target_level = s.coin + 1
+		left = _place(target_level, promos)
+		gained += (promos - left) * coin_value(target_level)
+		while left:
+			# unable to place (no free slot): overwrite this slot with the promoted coin
+			s.coin = target_level
+			s.count = 1
+			gained += coin_value(target_level)
+			left -= 1
+			if left:
+				target_level = s.coin + 1
+				placed = left - _place(target_level, left)
+				gained += placed * coin_value(target_level)
+				left -= placed
+		# if this slot emptied, mark empty
+		if s.count == 0:
+			s.coin = 0
+	gained = int(gained * prestige_mult)
+	currency += gained
+	return currency, gained
+
+
+class SpawnDistribution:
+	"""Deal spawn weights for one slot occupancy and cap.
+
+	Keeps the cumulative weight table so each draw is a single bisect. When
+	nothing can be placed it holds only C1 with no weights, and sample()
+	returns C1 without drawing.
+	"""
+
+	def __init__(self, levels, weights):
+		self.levels = levels
+		self.weights = weights
+		self.cum_weights = list(accumulate(weights)) if weights else None
+		self._probs = None
+
+	def sample(self, rng=random):
+		if self.cum_weights is None:
+			return self.levels[0]
+		return rng.choices(self.levels, cum_weights=self.cum_weights, k=1)[0]
+
+	def probabilities(self):
+		# level -> percent
+		if self._probs is None:
+			total = self.cum_weights[-1] if self.cum_weights else 0
+			if total <= 0:
+				self._probs = {1: 100.0}
+			else:
+				self._probs = {l: (w / total) * 100.0 for l, w in zip(self.levels, self.weights)}
+		return self._probs
+
+
+def _build_spawn_distribution(index, cap):
+	# New behavior: include baseline low levels (C1-C3) plus any levels present in slots,
+	# but ensure C1-C3 together have ~95% probability while higher levels share ~5%.
+	# Also respect placement availability (same-level slot with room or any empty slot).
+	present = set(index.levels())
+	# baseline low levels (respect cap)
+	base_max = 3
+	if cap is not None:
+		base_max = min(base_max, cap)
+	base_levels = set(range(1, base_max + 1))
+	candidate_levels = sorted(present | base_levels)
+
+	_can_place = index.can_place
+
+	# filter to only placeable levels
+	levels = [l for l in candidate_levels if _can_place(l)]
+	# if no placeable levels remain, try to find any placeable up to cap
+	if not levels:
+		max_try = cap if cap is not None else max(5, max(present) if present else 3)
+		found = None
+		for l in range(1, max_try + 1):
+			if _can_place(l):
+				found = l
+				break
+		if found is None:
+			return SpawnDistribution([1], None)
+		levels = [found]
+
+	# Partition low (<=3) and high (>3)
+	low_levels = [l for l in levels if l <= 3]
+	high_levels = [l for l in levels if l > 3]
+
+	# Desired mass percents
+	LOW_MASS = 95.0
+	HIGH_MASS = max(0.0, 100.0 - LOW_MASS)
+
+	weights = []
+	if low_levels:
+		low_share = LOW_MASS / len(low_levels)
+	else:
+		low_share = 0.0
+
+	if high_levels:
+		min_high = min(high_levels)
+		raw = [DEAL_WEIGHT_DECAY ** (-(l - min_high)) for l in high_levels]
+		sum_raw = sum(raw)
+		scaled = [(r / sum_raw) * HIGH_MASS for r in raw]
+		high_map = dict(zip(high_levels, scaled))
+	else:
+		high_map = {}
+
+	for l in levels:
+		if l in low_levels:
+			weights.append(low_share)
+		else:
+			weights.append(high_map.get(l, 0.0))
+	return SpawnDistribution(levels, weights)
+
+
+def spawn_distribution(slots, cap=None):
+	"""Return the (cached) SpawnDistribution for the current slot occupancy and cap.
+
+	The cache lives on the slots' SlotIndex and is reused until a change in
+	occupancy bumps the index version.
+	"""
+	index = slot_index(slots)
+	entry = index.spawn_cache.get(cap)
+	if entry is not None and entry[0] == index.version:
+		return entry[1]
+	dist = _build_spawn_distribution(index, cap)
+	index.spawn_cache[cap] = (index.version, dist)
+	return dist
+
+
+def weighted_random_coin(*args, **kwargs):
+	"""Compatibility wrapper:
+	- New usage: weighted_random_coin(slots, cap=...)
+	- Old usage: weighted_random_coin(max_level=...)
+	Both take an optional `rng` (a random.Random; the global one by default).
+	"""
+	# detect old-style call
+	max_level = kwargs.get('max_level', None)
+	cap = kwargs.get('cap', None)
+	rng = kwargs.get('rng') or random
+	slots = None
+	if args:
+		first = args[0]
+		if isinstance(first, list):
+			slots = first
+		elif isinstance(first, int):
+			max_level = first
+
+	if slots is None:
+		# fallback to original fixed-weight behavior when called with max_level
+		if max_level is None:
+			max_level = 5
+		base_weights = [50, 30, 12, 6, 2]
+		weights = base_weights[:max_level]
+		return rng.choices(range(1, len(weights) + 1), weights=weights, k=1)[0]
+
+	return spawn_distribution(slots, cap).sample(rng)
+
+
+def compute_spawn_probabilities(slots, cap=None):
+	"""Return a dict level → percent for spawn probabilities given current slots.
+	Shares the cached distribution used by weighted_random_coin for the slots case.
+	"""
+	return dict(spawn_distribution(slots, cap).probabilities())
+
+
+def deal_batch(state, n, rng=None, cap=None, combine_each=False, deal_size=None):
+	"""Deal `n` coins into `state` in one call and return the dealt levels.
+
+	All uniforms for the batch are drawn up front and each is mapped through
+	the cached cumulative table of the occupancy it lands in, so the result
+	(and the random stream consumed) is the same as calling
+	weighted_random_coin + add_coin_to_slots n times. Combines are resolved
+	once at the end, or after every coin with `combine_each` (worker deals),
+	and never grant currency. With `deal_size`, the batch is that many
+	back-to-back deals of deal_size coins, the cap read from the state at
+	the start of each, as if deal_batch were called once per deal.
+	"""
+	rng = random if rng is None else rng
+	slots = state.slots
+	if cap is None and not deal_size:
+		cap = state.deal_cap()
+	index = slot_index(slots)
+	cache = index.spawn_cache
+	saved = rng.getstate()
+	draw = rng.random
+	uniforms = [draw() for _ in range(n)]
+	rewound = False
+	dealt = []
+	for i in range(n):
+		if deal_size and i % deal_size == 0:
+			if i and not combine_each:
+				process_combines(slots, state.currency, state.prestige_mult)
+			cap = state.deal_cap()
+		entry = cache.get(cap)
+		if entry is not None and entry[0] == index.version:
+			dist = entry[1]
+		else:
+			dist = spawn_distribution(slots, cap)
+		cum = dist.cum_weights
+		if cum is None:
+			# nothing placeable: the sequential path deals C1 without drawing, so
+			# hand back the pre-drawn uniforms and draw one at a time from here on
+			if not rewound:
+				rng.setstate(saved)
+				for _ in range(i):
+					draw()
+				rewound = True
+			lvl = dist.levels[0]
+		else:
+			u = draw() if rewound else uniforms[i]
+			lvl = dist.levels[bisect(cum, u * cum[-1], 0, len(cum) - 1)]
+		add_coin_to_slots(slots, lvl)
+		dealt.append(lvl)
+		if combine_each and index.full_mask:
+			process_combines(slots, state.currency, state.prestige_mult)
+	if not combine_each:
+		process_combines(slots, state.currency, state.prestige_mult)
+	return dealt
+
+
+class MarketLevel:
+	"""Recent sales of one coin level, with running aggregates for pricing.
+
+	Each sale is stored once, as a (price, time, weight) record in array-backed
+	ring buffers holding the latest MARKET_HISTORY_LEN sales; weight is the
+	number of coins sold times SELL_IMPACT_MULTIPLIER. Every pricing window is
+	a range of records with running weighted sums, moved forward as records
+	expire, so pricing a level is O(1) however large the sales were.
+	"""
+	__slots__ = (
+		"prices", "times", "weights", "start", "end",
+		"last", "last_sum", "last_weight",
+		"recent", "recent_sum", "recent_weight",
+		"volume", "volume_weight",
+	)
+
+	def __init__(self):
+		# doubles, so late-game prices (C60+) can't overflow; sums use the stored value
+		self.prices = array("d")
+		self.times = array("d")
+		self.weights = array("q")
+		# records are numbered in sale order; [start, end) are still kept
+		self.start = 0
+		self.end = 0
+		# first record of each window, with its running sums
+		# last: just enough of the latest records to cover MARKET_PRICE_SAMPLES units
+		self.last = 0
+		self.last_sum = 0
+		self.last_weight = 0
+		# recent: records inside the base price window
+		self.recent = 0
+		self.recent_sum = 0
+		self.recent_weight = 0
+		# volume: records inside the demand window
+		self.volume = 0
+		self.volume_weight = 0
+
+	def add(self, price, now, weight):
+		if weight <= 0:
+			return
+		if self.end - self.start == MARKET_HISTORY_LEN:
+			self._evict()
+		i = self.end % MARKET_HISTORY_LEN
+		if i == len(self.prices):
+			self.prices.append(price)
+			self.times.append(now)
+			self.weights.append(weight)
+		else:
+			self.prices[i] = price
+			self.times[i] = now
+			self.weights[i] = weight
+		self.end += 1
+		value = int(self.prices[i]) * weight
+		self.last_sum += value
+		self.last_weight += weight
+		self.recent_sum += value
+		self.recent_weight += weight
+		self.volume_weight += weight
+		# drop the oldest records the latest samples no longer need
+		while True:
+			j = self.last % MARKET_HISTORY_LEN
+			w = self.weights[j]
+			if self.last_weight - w < MARKET_PRICE_SAMPLES:
+				break
+			self.last_sum -= int(self.prices[j]) * w
+			self.last_weight -= w
+			self.last += 1
+
+	def _evict(self):
+		# the ring is full: forget the oldest record, including in any window still holding it
+		seq = self.start
+		i = seq % MARKET_HISTORY_LEN
+		price = int(self.prices[i])
+		weight = self.weights[i]
+		if self.last == seq:
+			self.last_sum -= price * weight
+			self.last_weight -= weight
+			self.last += 1
+		if self.recent == seq:
+			self.recent_sum -= price * weight
+			self.recent_weight -= weight
+			self.recent += 1
+		if self.volume == seq:
+			self.volume_weight -= weight
+			self.volume += 1
+		self.start += 1
+
+	def expire(self, now):
+		# drop records that fell out of the windows (time only moves forward)
+		times = self.times
+		while self.recent < self.end:
+			i = self.recent % MARKET_HISTORY_LEN
+			if now - times[i] <= MARKET_LOOKBACK * 2.0:
+				break
+			weight = self.weights[i]
+			self.recent_sum -= int(self.prices[i]) * weight
+			self.recent_weight -= weight
+			self.recent += 1
+		while self.volume < self.end:
+			i = self.volume % MARKET_HISTORY_LEN
+			if now - times[i] <= MARKET_LOOKBACK:
+				break
+			self.volume_weight -= self.weights[i]
+			self.volume += 1
+
+	def _latest_mean(self):
+		# mean price of the latest MARKET_PRICE_SAMPLES units (the first record may count only partly)
+		excess = self.last_weight - MARKET_PRICE_SAMPLES
+		if excess > 0:
+			total = self.last_sum - excess * int(self.prices[self.last % MARKET_HISTORY_LEN])
+			return int(total / MARKET_PRICE_SAMPLES)
+		return int(self.last_sum / self.last_weight)
+
+	def base_price(self, level):
+		# prefer only fairly recent sales for base price to allow faster recovery
+		if self.recent < self.end:
+			if self.recent_weight >= MARKET_PRICE_SAMPLES:
+				return self._latest_mean()
+			return int(self.recent_sum / self.recent_weight)
+		if self.end > self.start:
+			# there are older sales but none recent: blend their average with the base coin value
+			return int(0.4 * self._latest_mean() + 0.6 * coin_value(level))
+		return coin_value(level)
+
+	def recent_count(self):
+		# weighted number of sales inside the demand window
+		return self.volume_weight
+
+	def last_time(self):
+		if self.end == self.start:
+			return None
+		return self.times[(self.end - 1) % MARKET_HISTORY_LEN]
+
+	def columns(self):
+		# copies of the kept (prices, times, weights) columns, oldest first
+		n = self.end - self.start
+		i = self.start % MARKET_HISTORY_LEN
+
+		def ordered(a):
+			if i + n <= len(a):
+				return a[i:i + n]
+			return a[i:] + a[:i + n - len(a)]
+		return ordered(self.prices), ordered(self.times), ordered(self.weights)
+
+	@classmethod
+	def from_columns(cls, prices, times, weights, now):
+		"""Rebuild from columns() output (times on the current clock), windows expired at `now`."""
+		m = cls()
+		n = min(len(prices), MARKET_HISTORY_LEN)
+		m.prices = array("d", prices[len(prices) - n:])
+		m.times = array("d", times[len(times) - n:])
+		m.weights = array("q", weights[len(weights) - n:])
+		m.end = n
+		prices = m.prices
+		times = m.times
+		weights = m.weights
+		# latest MARKET_PRICE_SAMPLES units (same invariant add() keeps)
+		j = n
+		while j > 0 and m.last_weight < MARKET_PRICE_SAMPLES:
+			j -= 1
+			m.last_weight += weights[j]
+			m.last_sum += int(prices[j]) * weights[j]
+		m.last = j
+		# first record inside each window, with the exact test expire() uses
+		for window, attr in ((MARKET_LOOKBACK * 2.0, "recent"), (MARKET_LOOKBACK, "volume")):
+			k = bisect_left(times, now - window)
+			while k > 0 and now - times[k - 1] <= window:
+				k -= 1
+			while k < n and now - times[k] > window:
+				k += 1
+			setattr(m, attr, k)
+		m.recent_sum = sum(map(mul, map(int, prices[m.recent:]), weights[m.recent:]))
+		m.recent_weight = sum(weights[m.recent:])
+		m.volume_weight = sum(weights[m.volume:])
+		return m
+
+
+class PriceHistory:
+	"""Fixed-capacity ring buffer of chart price samples for one level.
+
+	Every sample is written twice, `capacity` apart, so the latest samples
+	always form one contiguous slice: view() hands them out oldest first
+	without copying, and appending never shifts anything.
+	"""
+	__slots__ = ("capacity", "buf", "count", "pos", "last_time")
+
+	def __init__(self, capacity):
+		self.capacity = capacity
+		self.buf = array("d", [0.0]) * (2 * capacity)
+		self.count = 0
+		# where the next sample goes (0 .. capacity-1)
+		self.pos = 0
+		self.last_time = None
+
+	@classmethod
+	def from_samples(cls, capacity, samples, last_time):
+		# rebuild from view() output (oldest first) in one go
+		hist = cls(capacity)
+		n = min(len(samples), capacity)
+		if n:
+			tail = array("d", samples[len(samples) - n:])
+			hist.buf[0:n] = tail
+			hist.buf[capacity:capacity + n] = tail
+			hist.count = n
+			hist.pos = n % capacity
+			hist.last_time = last_time
+		return hist
+
+	def append(self, price, now):
+		self.buf[self.pos] = price
+		self.buf[self.pos + self.capacity] = price
+		self.pos = (self.pos + 1) % self.capacity
+		if self.count < self.capacity:
+			self.count += 1
+		self.last_time = now
+
+	def view(self):
+		# read-only memoryview of the samples, oldest first
+		start = self.pos + self.capacity - self.count
+		return memoryview(self.buf)[start:start + self.count].toreadonly()
+
+	def __len__(self):
+		return self.count
+
+	def __iter__(self):
+		return iter(self.view())
+
+
+class DerivedState:
+	"""What the UI reads off a GameState every frame, computed in one go.
+
+	Built from the SlotIndex's running per-level counts, so it costs a pass
+	over the held levels rather than over the slots. GameState.derived()
+	hands out the same object until a slot, the unlocked slots or the
+	currency change. Treat it (including buy_levels and supply) as read-only.
+	"""
+
+	__slots__ = (
+		"index", "changes", "unlocked_slots", "currency", "current_max", "highest_purchasable",
+		"buy_levels", "max_deal_level", "deal_cap", "slot_cost", "has_place", "no_moves", "supply",
+	)
+
+	def __init__(self, state, index):
+		# what this was computed from
+		self.index = index
+		self.changes = index.changes
+		self.unlocked_slots = state.unlocked_slots
+		self.currency = state.currency
+		self.current_max = index.max_level
+		# highest purchasable is always one below current highest merged
+		highest = self.highest_purchasable = max(1, self.current_max - 1)
+		self.buy_levels = [max(1, highest - 2), max(1, highest - 1), highest]
+		# allow dealing to spawn coins up to one level above current_max (no hard cap)
+		self.max_deal_level = max(3, self.current_max + 1, state.unlocked_slots)
+		self.deal_cap = min(self.max_deal_level, state.unlocked_slots + 2)
+		self.slot_cost = slot_cost(state.unlocked_slots)
+		self.has_place = index.any_place_up_to(self.max_deal_level)
+		# can't place any reasonable coin and can't afford a slot
+		self.no_moves = not self.has_place and state.currency < self.slot_cost
+		# coins held per level (for UI counts only)
+		self.supply = {lvl: index.level_count.get(lvl, 0) for lvl in range(1, max(3, self.current_max) + 1)}
+
+	def current(self, state, index):
+		return (
+			index is self.index and index.changes == self.changes
+			and state.unlocked_slots == self.unlocked_slots and state.currency == self.currency
+		)
+
+
+class GameState:
+	"""All mutable state of one game plus the actions that change it.
+
+	Time is always passed in explicitly (`now`, in seconds) so the same code
+	runs against pygame's clock in game.py and a simulated clock in Simulator.
+	"""
+
+	def __init__(self, seed=None):
+		# random streams for deals and market noise (seed=None: unpredictable)
+		self.rng = RandomStreams(seed)
+		self.slots = [Slot() for _ in range(INITIAL_SLOTS)]
+		self.unlocked_slots = INITIAL_SLOTS
+		self.currency = INITIAL_CURRENCY
+		self.prestige_mult = 1.0
+		self.prestige_level = 0
+		self.last_gain = 0
+		# Worker upgrade state
+		self.worker_owned = False
+		self.worker_enabled = False
+		self.worker_last_deal_time = 0.0
+		# Worker upgrade state: when True, worker uses same cooldown as manual (not 2x)
+		self.worker_upgraded = False
+		# Time Thief upgrade state (reduces cooldowns)
+		self.time_thief_count = 0
+		self.deal_cooldown = DEAL_COOLDOWN
+		self.last_deal_time = -9999.0
+
+		# recent sales used for pricing: level -> MarketLevel
+		self.market_sales = {}
+		# computed current prices (updated on actions)
+		self.current_prices = {}
+		# market price history for chart: level -> PriceHistory of recent displayed prices
+		self.price_history = {}
+		self.price_history_max = 80
+		# bumped whenever a new price sample is appended (lets the UI skip redrawing an unchanged chart)
+		self.price_version = 0
+		# price update throttle (seconds) - update every 1s per request
+		self.price_update_interval = 1.0
+		self.last_price_update = 0.0
+		# DerivedState of the last derived() call
+		self._derived = None
+		# (deals made, deals skipped) by the last offline catch-up, for the UI
+		self.last_catchup = None
+
+	# --- run lifecycle ---
+
+	def new_game(self, now):
+		# start a fresh game (market history is kept)
+		self.slots = [Slot() for _ in range(INITIAL_SLOTS)]
+		self.unlocked_slots = INITIAL_SLOTS
+		self.currency = INITIAL_CURRENCY
+		self.prestige_mult = 1.0
+		self.prestige_level = 0
+		self.worker_owned = False
+		self.worker_enabled = False
+		self.worker_last_deal_time = now
+		self.time_thief_count = 0
+		self.worker_upgraded = False
+
+	def restart_run(self):
+		# restart current run (preserve prestige and upgrades)
+		self.slots = [Slot() for _ in range(INITIAL_SLOTS)]
+		self.unlocked_slots = INITIAL_SLOTS
+		self.currency = 0
+		self.last_gain = 0
+
+	def can_prestige(self):
+		return self.unlocked_slots > INITIAL_SLOTS or self.currency >= PRESTIGE_MIN_CURRENCY
+
+	def prestige(self):
+		if not self.can_prestige():
+			return False
+		self.prestige_level += 1
+		self.prestige_mult = 1.0 + self.prestige_level * 0.1
+		self.currency = 0
+		self.slots = [Slot() for _ in range(INITIAL_SLOTS)]
+		self.unlocked_slots = INITIAL_SLOTS
+		self.last_gain = 0
+		return True
+
+	# --- derived values ---
+
+	def effective_deal_cooldown(self):
+		return max(MIN_DEAL_COOLDOWN, self.deal_cooldown - self.time_thief_count * TIME_THIEF_REDUCTION)
+
+	def max_time_thief_count(self):
+		# compute how many Time Thiefs can be purchased before reaching MIN_DEAL_COOLDOWN
+		maxc = int((self.deal_cooldown - MIN_DEAL_COOLDOWN) / TIME_THIEF_REDUCTION)
+		return max(0, maxc)
+
+	def worker_interval(self):
+		# worker uses the effective cooldown (Time Thief reduces both manual and worker speeds)
+		worker_multiplier = 1.0 if self.worker_upgraded else 2.0
+		return self.effective_deal_cooldown() * worker_multiplier
+
+	def derived(self):
+		# board-derived values, recomputed only after the slots, unlocked slots or currency changed
+		index = slot_index(self.slots)
+		derived = self._derived
+		if derived is None or not derived.current(self, index):
+			derived = self._derived = DerivedState(self, index)
+		return derived
+
+	def current_max(self):
+		return self.derived().current_max
+
+	def highest_purchasable(self):
+		return self.derived().highest_purchasable
+
+	def buy_levels(self):
+		return self.derived().buy_levels
+
+	def max_deal_level(self):
+		return self.derived().max_deal_level
+
+	def deal_cap(self):
+		return self.derived().deal_cap
+
+	def slot_cost(self):
+		return self.derived().slot_cost
+
+	# helpers to detect if a coin of `level` can be placed (without mutating state)
+	def can_place_level(self, level):
+		return slot_index(self.slots).can_place(level)
+
+	def any_place_up_to(self, max_level):
+		return slot_index(self.slots).any_place_up_to(max_level)
+
+	def no_moves(self):
+		return self.derived().no_moves
+
+	def supply(self):
+		return self.derived().supply
+
+	# --- dealing ---
+
+	def deal(self, combine_each=False):
+		# deal one coin per unlocked slot; combines do NOT grant currency for deals
+		deal_batch(self, self.unlocked_slots, rng=self.rng.spawn, combine_each=combine_each)
+		self.last_gain = 0
+
+	def manual_deal(self, now):
+		# use effective cooldown (reduced by Time Thief purchases)
+		if now - self.last_deal_time < self.effective_deal_cooldown():
+			# still cooling down; ignore
+			return False
+		self.deal()
+		self.last_deal_time = now
+		return True
+
+	def worker_tick(self, now, paused=False):
+		# worker auto-deal: executes the same spawn logic as the Deal button,
+		# resolving combines after every coin
+		if not (self.worker_owned and self.worker_enabled) or paused:
+			return False
+		if now - self.worker_last_deal_time < self.worker_interval():
+			return False
+		self.deal(combine_each=True)
+		self.worker_last_deal_time = now
+		self.update_market_prices(now)
+		return True
+
+	def fast_forward_worker(self, seconds, max_deals=OFFLINE_MAX_DEALS):
+		"""Make the worker deals that were missed over `seconds` of absence.
+
+		The missed deals run as one deal_batch: the same coins and combines as
+		that many worker_tick deals, but with no clock or market updates in
+		between. worker_last_deal_time moves forward past them. At most
+		`max_deals` are made; the rest of the absence is skipped, and
+		last_catchup reports (deals made, deals skipped). Returns the number
+		of deals made.
+		"""
+		self.last_catchup = None
+		if not (self.worker_owned and self.worker_enabled) or seconds <= 0:
+			return 0
+		interval = self.worker_interval()
+		missed = int(seconds // interval)
+		deals = min(missed, max_deals)
+		if deals:
+			n = self.unlocked_slots
+			deal_batch(self, deals * n, rng=self.rng.spawn, combine_each=True, deal_size=n)
+			self.last_gain = 0
+		# skipped deals give up their time too, so none fires the moment the game resumes
+		self.worker_last_deal_time += missed * interval
+		self.last_catchup = (deals, missed - deals)
+		return deals
+
+	def toggle_worker(self, now):
+		if not self.worker_owned:
+			return False
+		self.worker_enabled = not self.worker_enabled
+		if self.worker_enabled:
+			self.worker_last_deal_time = now
+		return True
+
+	# --- purchases ---
+
+	def buy_coin(self, level, now):
+		cost = coin_value(level)
+		if self.currency < cost or level > self.highest_purchasable():
+			return False
+		self.currency -= cost
+		add_coin_to_slots(self.slots, level)
+		self.currency, self.last_gain = process_combines(self.slots, self.currency, self.prestige_mult)
+		self.update_market_prices(now)
+		return True
+
+	def buy_slot(self):
+		cost = self.slot_cost()
+		if self.currency < cost or self.unlocked_slots >= MAX_SLOTS:
+			return False
+		self.currency -= cost
+		self.slots.append(Slot())
+		self.unlocked_slots += 1
+		return True
+
+	def buy_worker(self, now):
+		if self.currency < WORKER_COST or self.worker_owned:
+			return False
+		self.currency -= WORKER_COST
+		self.worker_owned = True
+		# enable worker immediately for convenience
+		self.worker_enabled = True
+		self.worker_last_deal_time = now
+		return True
+
+	def buy_worker_upgrade(self):
+		# can only buy the worker upgrade if player owns the worker and has maxed Time Thiefs
+		if (self.currency < WORKER_UPGRADE_COST or not self.worker_owned or self.worker_upgraded
+				or self.time_thief_count < self.max_time_thief_count()):
+			return False
+		self.currency -= WORKER_UPGRADE_COST
+		self.worker_upgraded = True
+		return True
+
+	def buy_time_thief(self):
+		if self.currency < TIME_THIEF_COST or self.time_thief_count >= self.max_time_thief_count():
+			return False
+		self.currency -= TIME_THIEF_COST
+		self.time_thief_count += 1
+		return True
+
+	# --- selling ---
+
+	def price_of(self, level):
+		return self.current_prices.get(level, coin_value(level))
+
+	def record_sale(self, level, price, now, count=1):
+		# record the sale once; its weight amplifies its impact on prices
+		if count <= 0:
+			return
+		market = self.market_sales.get(level)
+		if market is None:
+			market = self.market_sales[level] = MarketLevel()
+		market.add(price, now, count * SELL_IMPACT_MULTIPLIER)
+
+	def sell(self, slot_idx, now, count=None, level=None):
+		"""Sell up to `count` coins (all when None) from one slot at the market price.
+
+		When `level` is given the slot must still hold that level. Returns the
+		number of coins sold.
+		"""
+		if slot_idx is None or not (0 <= slot_idx < len(self.slots)):
+			return 0
+		s = self.slots[slot_idx]
+		if s.is_empty() or s.count <= 0 or (level is not None and s.coin != level):
+			return 0
+		lvl = s.coin
+		n = s.count if count is None else min(count, s.count)
+		price = self.price_of(lvl)
+		s.count -= n
+		if s.count == 0:
+			s.coin = 0
+		self.currency += price * n
+		self.record_sale(lvl, price, now, n)
+		# update market prices after sale
+		self.update_market_prices(now)
+		return n
+
+	def sell_highest_at_half(self):
+		# sell one coin from the highest-level non-empty slot at half its base value
+		best = None
+		for i, s in enumerate(self.slots):
+			if not s.is_empty() and s.count > 0:
+				if best is None or s.coin > self.slots[best].coin:
+					best = i
+		if best is None:
+			return False
+		s = self.slots[best]
+		lvl = s.coin
+		s.count -= 1
+		if s.count == 0:
+			s.coin = 0
+		self.currency += coin_value(lvl) // 2
+		return True
+
+	# --- drag and drop ---
+
+	def take_coin(self, slot_idx):
+		# pick up one coin from a slot; returns its level (None if nothing to take)
+		if not (0 <= slot_idx < len(self.slots)) or self.slots[slot_idx].is_empty():
+			return None
+		src = self.slots[slot_idx]
+		level = src.coin
+		src.count -= 1
+		if src.count <= 0:
+			src.coin = 0
+		return level
+
+	def _return_coin(self, level, src):
+		if src is not None and src < len(self.slots):
+			s = self.slots[src]
+			s.coin = level if s.coin == 0 else s.coin
+			s.count += 1
+			return
+		# try to find an empty slot (discard if none, shouldn't happen)
+		for s in self.slots:
+			if s.is_empty():
+				s.coin = level
+				s.count = 1
+				return
+
+	def drop_coin(self, level, target, src):
+		# drop a picked-up coin on `target` (None: dropped outside any slot)
+		if target is None:
+			# return to source
+			self._return_coin(level, src)
+			return
+		t = self.slots[target]
+		if t.is_empty():
+			t.coin = level
+			t.count = 1
+		elif t.coin == level:
+			# same kind: add one, then process combines
+			t.count += 1
+			self.currency, self.last_gain = process_combines(self.slots, self.currency, self.prestige_mult)
+		else:
+			# different kind: return to source
+			self._return_coin(level, src)
+
+	# --- market ---
+
+	def update_market_prices(self, now):
+		# compute prices from recent sales history and recent sale volume
+		noise_rng = self.rng.market
+		held = slot_index(self.slots).levels()
+		# levels that are not held and have not been sold for a while stay priced but off the chart
+		idle = {
+			k for k, market in self.market_sales.items()
+			if k not in held and k > 3 and now - market.last_time() > MARKET_IDLE_EVICT
+		}
+		# include levels from recent sales so chart updates even after the player no longer holds that coin
+		levels_set = set(held)
+		levels_set.update(self.market_sales.keys())
+		# always include lowest few levels for display
+		levels_set.update((1, 2, 3))
+		levels = sorted(levels_set)
+		for lvl in levels:
+			market = self.market_sales.get(lvl)
+			if market is not None:
+				market.expire(now)
+				base_price = market.base_price(lvl)
+				recent_sales_count = market.recent_count()
+			else:
+				base_price = coin_value(lvl)
+				recent_sales_count = 0
+			# demand factor decreases as recent sales increase
+			demand = max(0.3, 1.2 - (recent_sales_count / (10.0 + lvl)))
+			# small noise
+			noise = noise_rng.uniform(-0.02, 0.02)
+			price = int(base_price * demand * (1.0 + noise))
+			self.current_prices[lvl] = max(1, price)
+			if lvl in idle:
+				self.price_history.pop(lvl, None)
+				continue
+			# append to small chart history so chart reflects price movements
+			hist = self.price_history.get(lvl)
+			if hist is None:
+				hist = self.price_history[lvl] = PriceHistory(self.price_history_max)
+			hist.append(self.current_prices[lvl], now)
+		# drop chart lines of levels that stopped being priced a while ago
+		stale = [
+			lvl for lvl, hist in self.price_history.items()
+			if lvl not in levels_set and now - hist.last_time > MARKET_IDLE_EVICT
+		]
+		for lvl in stale:
+			del self.price_history[lvl]
+		self.price_version += 1
+
+	def tick_market(self, now):
+		# returns True if prices were recalculated
+		updated = False
+		# backup update if there are no recorded market prices yet
+		if not self.current_prices:
+			self.update_market_prices(now)
+			updated = True
+		# periodic market price recalculation (every interval)
+		if now - self.last_price_update >= self.price_update_interval:
+			self.update_market_prices(now)
+			self.last_price_update = now
+			updated = True
+		return updated
+
+	def tick(self, now, paused=False):
+		# per-frame timers: market refresh, then worker auto-deal
+		self.tick_market(now)
+		self.worker_tick(now, paused)
+
+	def market_due(self):
+		# when tick_market() next recalculates prices
+		if not self.current_prices:
+			return self.last_price_update
+		return self.last_price_update + self.price_update_interval
+
+	def worker_due(self):
+		# when the worker next deals (None while it is off)
+		if not (self.worker_owned and self.worker_enabled):
+			return None
+		return self.worker_last_deal_time + self.worker_interval()
+
+	def next_due_time(self):
+		# earliest time at which tick() has work to do
+		due = self.market_due()
+		worker = self.worker_due()
+		return due if worker is None else min(due, worker)
+
+	# --- persistence ---
+
+	def to_save_data(self, wall_time=None):
+		# `wall_time` (seconds since the epoch) lets the worker catch up after loading
+		data = {
+			"slots": [{"coin": s.coin, "count": s.count} for s in self.slots],
+			"unlocked_slots": self.unlocked_slots,
+			"currency": self.currency,
+			"prestige_level": self.prestige_level,
+			"worker_owned": bool(self.worker_owned),
+			"worker_enabled": bool(self.worker_enabled),
+			"time_thief_count": int(self.time_thief_count),
+			"worker_upgraded": bool(self.worker_upgraded),
+		}
+		if wall_time is not None:
+			data["saved_at"] = wall_time
+		return data
+
+	def load_save_data(self, data, wall_time=None):
+		# clamp loaded unlocked_slots to MAX_SLOTS
+		loaded_slots = int(data.get("unlocked_slots", INITIAL_SLOTS))
+		loaded_slots = max(INITIAL_SLOTS, min(MAX_SLOTS, loaded_slots))
+		self.slots = [Slot() for _ in range(loaded_slots)]
+		for i, sdata in enumerate(data.get("slots", [])):
+			if i < len(self.slots):
+				self.slots[i].coin = sdata.get("coin", 0)
+				self.slots[i].count = sdata.get("count", 0)
+		self.unlocked_slots = loaded_slots
+		self.currency = data.get("currency", 0)
+		self.prestige_level = data.get("prestige_level", 0)
+		self.prestige_mult = 1.0 + self.prestige_level * 0.1
+		# restore worker state if present
+		self.worker_owned = data.get("worker_owned", False)
+		self.worker_enabled = data.get("worker_enabled", False)
+		self.worker_upgraded = data.get("worker_upgraded", False)
+		# restore Time Thief purchases if present
+		self.time_thief_count = data.get("time_thief_count", 0)
+		# the worker kept dealing while the game was closed
+		saved_at = data.get("saved_at")
+		if wall_time is not None and saved_at is not None:
+			offline = max(0.0, wall_time - saved_at)
+			# its last deal was `offline` ago; the catch-up moves it forward again
+			self.worker_last_deal_time -= offline
+			self.fast_forward_worker(offline)
+
+
+class TimerQueue:
+	"""Deadlines of named timers, kept in a priority queue.
+
+	set(name, due) (re)schedules a timer and set(name, None) cancels it.
+	Superseded entries stay in the heap and are dropped when they reach the
+	top, so rescheduling costs a dict lookup and at most one push.
+	"""
+
+	def __init__(self):
+		self.heap = []
+		self.due = {}
+
+	def set(self, name, due):
+		if self.due.get(name) == due:
+			return
+		if due is None:
+			del self.due[name]
+			return
+		self.due[name] = due
+		heapq.heappush(self.heap, (due, name))
+
+	def next_due(self):
+		heap = self.heap
+		while heap and self.due.get(heap[0][1]) != heap[0][0]:
+			heapq.heappop(heap)
+		return heap[0][0] if heap else None
+
+	def pop(self, now):
+		# remove and return (name, due) of the earliest timer due by `now`, else None
+		due = self.next_due()
+		if due is None or due > now:
+			return None
+		_, name = heapq.heappop(self.heap)
+		del self.due[name]
+		return name, due
+
+
+class Simulator:
+	"""Runs a GameState on a simulated fixed-step clock, without any display.
+
+	`tick()` advances one frame exactly like the pygame loop does. `run()`
+	jumps straight to the frames where a timer is due, so long idle or
+	worker-only stretches cost time proportional to the number of deals
+	and price refreshes rather than the number of frames.
+	"""
+
+	def __init__(self, state=None, dt=1.0 / 60.0, seed=None):
+		self.state = state if state is not None else GameState(seed)
+		self.dt = dt
+		self.ticks = 0
+		self.now = 0.0
+
+	def _advance(self, steps):
+		self.ticks += steps
+		# derive time from the tick count so long runs don't accumulate float drift
+		self.now = self.ticks * self.dt
+
+	def tick(self):
+		self._advance(1)
+		self.state.tick(self.now)
+
+	def run(self, seconds, policy=None):
+		"""Advance `seconds` of game time.
+
+		With a `policy`, it is called as policy(sim) after every frame so it
+		can deal, buy and sell; without one, frames with no due timer are
+		skipped entirely.
+		"""
+		end = self.ticks + int(round(seconds / self.dt))
+		state = self.state
+		if policy is not None:
+			while self.ticks < end:
+				self.tick()
+				policy(self)
+			return
+		while self.ticks < end:
+			due = state.next_due_time()
+			steps = max(1, int(math.ceil((due - self.now) / self.dt - 1e-9)))
+			self._advance(min(steps, end - self.ticks))
+			state.tick(self.now)
+
+	# convenience wrappers using the simulated clock
+	def deal(self):
+		return self.state.manual_deal(self.now)
+
+	def sell(self, slot_idx, count=None):
+		return self.state.sell(slot_idx, self.now, count=count)
+
+	def buy_coin(self, level):
+		return self.state.buy_coin(level, self.now)
+
+	def buy_slot(self):
+		return self.state.buy_slot()
+
+	def buy_worker(self):
+		return self.state.buy_worker(self.now)
@@ -1,9 +1,25 @@
 import pygame
 import traceback
-import random
 import sys
-import json
 import os
+import time
+import threading
+import csv
+import math
+from collections import OrderedDict, deque
+
+import savefile
+import actionlog
+from actionlog import (
+	NewGame, RestartRun, Prestige, Deal, ToggleWorker, BuyCoin, BuySlot, BuyWorker,
+	BuyWorkerUpgrade, BuyTimeThief, Sell, SellHighestAtHalf, TakeCoin, DropCoin,
+	UpdatePrices, MarketTick, WorkerTick,
+)
+from engine import (
+	TimerQueue, SLOT_CAPACITY, OFFLINE_MAX_DEALS, WORKER_COST, TIME_THIEF_COST, TIME_THIEF_REDUCTION,
+	MIN_DEAL_COOLDOWN, WORKER_UPGRADE_COST, MAX_SLOTS,
+	GameState, coin_value, compute_spawn_probabilities,
+)
 
 # Detect available pygame font backends to avoid repeated import errors/warnings
 HAVE_PYGAME_FONT = False
@@ -24,40 +40,28 @@ except Exception:
 
 
 WIDTH, HEIGHT = 1280, 720
-SLOT_CAPACITY = 10
-INITIAL_SLOTS = 5
-WORKER_COST = 1000
-TIME_THIEF_COST = 500
-TIME_THIEF_REDUCTION = 0.25  # seconds reduced per Time Thief purchased
-# minimum possible manual deal cooldown (player-controlled)
-MIN_DEAL_COOLDOWN = 0.25
-# Worker upgrade cost: after max Time Thiefs, buy to make worker use same cooldown as manual
-WORKER_UPGRADE_COST = 7500
-DEAL_WEIGHT_DECAY = 2.0  # decay factor for deal weighting: higher -> stronger bias to small coins
 # UI layout limits
 MAX_SLOTS_PER_ROW = 6
-# game limits
-MAX_SLOTS = 18
-
-
-class Slot:
-	def __init__(self):
-		self.coin = 0  # 0 means empty, otherwise coin level (1,2,...)
-		self.count = 0
-
-	def is_empty(self):
-		return self.coin == 0
+# seconds between background autosaves while a game is running
+AUTOSAVE_INTERVAL = 30.0
+# game logic runs on a fixed step of 1/SIM_HZ s (100: game times stay whole milliseconds)
+SIM_HZ = 100
+# default cap on rendered frames per second (--fps N changes it)
+RENDER_FPS = 60
+# saves listed in the menu's load popup (newest first)
+LOAD_POPUP_ROWS = 8
+# posted by SaveLoader when a background load is done
+LOADED_EVENT = pygame.USEREVENT
+# posted by AutoSaver after each batch of writes (so a Save click's result shows without waiting)
+SAVED_EVENT = pygame.USEREVENT + 1
+# seconds a notice (e.g. the worker's offline catch-up) stays on screen
+NOTICE_SECONDS = 8.0
 
 
 def format_coin_label(level):
 	return f"C{level}"
 
 
-def coin_value(level):
-	# base value for a combined coin of given level
-	return 10 * (2 ** (level - 1))
-
-
 def make_button(rect, label):
 	return {"rect": pygame.Rect(rect), "label": label}
 
@@ -121,6 +125,249 @@ BITMAP_FONT = {
 	}
 
 
+class SurfaceCache:
+	"""Bounded LRU of rendered surfaces with hit/miss counters.
+
+	Cached surfaces are shared between callers, so treat them as read-only
+	(blit them, never draw onto them).
+	"""
+
+	def __init__(self, max_entries):
+		self.max_entries = max_entries
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key):
+		surf = self.entries.get(key)
+		if surf is None:
+			self.misses += 1
+			return None
+		self.hits += 1
+		self.entries.move_to_end(key)
+		return surf
+
+	def put(self, key, surf):
+		self.entries[key] = surf
+		self.entries.move_to_end(key)
+		if len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+		return surf
+
+	def clear(self):
+		self.entries.clear()
+
+
+class DirtyTracker:
+	"""Retained view of the last presented frame, used to find what needs repainting.
+
+	Every frame the UI reports each widget as (key, rect, signature). A widget
+	is dirty when its signature or rect changed, or when it appeared or went
+	away; its old and new rects are then returned by end(). Nothing changed
+	means an empty list, so the frame can skip drawing and presenting entirely.
+	"""
+
+	def __init__(self, screen_rect):
+		self.screen_rect = pygame.Rect(screen_rect)
+		self.widgets = {}
+		self.frame = {}
+		self.full = True
+
+	def invalidate(self):
+		# repaint everything on the next frame (new display surface, window exposed, ...)
+		self.full = True
+
+	def begin(self):
+		self.frame = {}
+
+	def track(self, key, rect, signature=None):
+		self.frame[key] = (pygame.Rect(rect), signature)
+
+	def end(self):
+		if self.full:
+			dirty = [self.screen_rect.copy()]
+		else:
+			dirty = []
+			for key, entry in self.frame.items():
+				old = self.widgets.get(key)
+				if old == entry:
+					continue
+				dirty.append(entry[0])
+				if old is not None and old[0] != entry[0]:
+					dirty.append(old[0])
+			for key, (rect, _) in self.widgets.items():
+				if key not in self.frame:
+					dirty.append(rect)
+			dirty = [r.clip(self.screen_rect) for r in dirty]
+			dirty = [r for r in dirty if r.width > 0 and r.height > 0]
+		self.widgets = self.frame
+		self.frame = {}
+		self.full = False
+		return dirty
+
+
+class SlotLayout:
+	"""Screen rects of the board's slots for one (unlocked slots, slot count, window size).
+
+	Slots sit on a grid of `cols` columns with every row centered, so cell_at()
+	finds the slot under a point with a few divisions instead of testing
+	every rect.
+	"""
+
+	SLOT_W = 140
+	SLOT_H = 140
+	MARGIN = 20
+	# horizontal padding from screen edges
+	LEFT_PAD = 50
+	RIGHT_PAD = 50
+	TOP = 50
+
+	def __init__(self, unlocked_slots, count, size):
+		slot_w, slot_h, margin = self.SLOT_W, self.SLOT_H, self.MARGIN
+		available_width = size[0] - self.LEFT_PAD - self.RIGHT_PAD
+		# compute maximum columns that fit given slot width+margin
+		max_cols = max(1, int((available_width + margin) // (slot_w + margin)))
+		# cap columns to a sensible maximum so rows wrap earlier on wide screens
+		max_cols = min(max_cols, MAX_SLOTS_PER_ROW)
+		# number of columns we'll use (don't exceed unlocked_slots)
+		cols = min(max_cols, max(1, unlocked_slots))
+		# ensure the computed cols actually fits in the available width
+		while cols > 1 and (cols * slot_w + (cols - 1) * margin) > available_width:
+			cols -= 1
+		total_rows = (unlocked_slots + cols - 1) // cols
+		self.cols = cols
+		# left edge of each row, centered horizontally (the last unlocked row may be shorter)
+		self.row_x = []
+		for row in range((count + cols - 1) // cols):
+			items_in_row = cols
+			if row == total_rows - 1:
+				items_in_row = max(1, unlocked_slots - row * cols)
+			row_width = items_in_row * slot_w + max(0, items_in_row - 1) * margin
+			self.row_x.append(self.LEFT_PAD + (available_width - row_width) // 2)
+		self.rects = [
+			pygame.Rect(self.row_x[i // cols] + (i % cols) * (slot_w + margin), self.TOP + (i // cols) * (slot_h + margin), slot_w, slot_h)
+			for i in range(count)
+		]
+
+	def cell_at(self, pos):
+		# index of the slot under `pos`, or None (margins and empty grid cells hit nothing)
+		x, y = pos
+		row, dy = divmod(y - self.TOP, self.SLOT_H + self.MARGIN)
+		if row < 0 or row >= len(self.row_x) or dy >= self.SLOT_H:
+			return None
+		col, dx = divmod(x - self.row_x[row], self.SLOT_W + self.MARGIN)
+		if col < 0 or col >= self.cols or dx >= self.SLOT_W:
+			return None
+		index = row * self.cols + col
+		return index if index < len(self.rects) else None
+
+
+class FrameProfiler:
+	"""Times the phases of every frame with perf_counter_ns.
+
+	begin_frame() closes the previous frame; mark(phase) charges the time
+	since the last mark to `phase`, and whatever was not marked counts as
+	"other". "frame" is the work of a frame: every phase except the IDLE
+	ones (sleeping until the next frame), which are reported on their own.
+	The last `window` frames give rolling p50/p99 per phase, and
+	start_trace() writes every frame to a CSV file (times in microseconds).
+	"""
+
+	PHASES = (
+		"wait", "timers", "state", "events", "layout",
+		"slots", "chart", "ui", "popups", "overlay", "present", "menu", "other",
+	)
+	# clock.tick and the event wait: not part of the frame's time
+	IDLE = ("wait",)
+
+	def __init__(self, window=300):
+		self.history = {p: deque(maxlen=window) for p in self.PHASES + ("frame",)}
+		self.current = None
+		self.frames = 0
+		self.started = time.perf_counter_ns()
+		self.frame_start = self.last = self.started
+		self.trace_file = None
+		self.trace = None
+
+	def begin_frame(self):
+		now = time.perf_counter_ns()
+		if self.current is not None:
+			self._finish(now)
+		self.current = dict.fromkeys(self.PHASES, 0)
+		self.frame_start = self.last = now
+
+	def mark(self, phase):
+		now = time.perf_counter_ns()
+		self.current[phase] += now - self.last
+		self.last = now
+
+	def _finish(self, now):
+		cur = self.current
+		total = now - self.frame_start
+		cur["other"] += total - sum(cur.values())
+		for phase, ns in cur.items():
+			self.history[phase].append(ns)
+		work = total - sum(cur[p] for p in self.IDLE)
+		self.history["frame"].append(work)
+		if self.trace is not None:
+			row = [self.frames, f"{(self.frame_start - self.started) / 1e6:.3f}", work // 1000]
+			row.extend(cur[p] // 1000 for p in self.PHASES)
+			self.trace.writerow(row)
+		self.frames += 1
+
+	def percentiles(self, phase):
+		# (p50, p99) in milliseconds over the window
+		values = sorted(self.history[phase])
+		if not values:
+			return 0.0, 0.0
+		n = len(values)
+		return values[n // 2] / 1e6, values[min(n - 1, (n * 99) // 100)] / 1e6
+
+	def start_trace(self, path):
+		self.stop_trace()
+		self.trace_file = open(path, "w", newline="")
+		self.trace = csv.writer(self.trace_file)
+		self.trace.writerow(["frame", "start_ms", "work_us"] + [f"{p}_us" for p in self.PHASES])
+
+	def stop_trace(self):
+		if self.trace_file is not None:
+			self.trace_file.close()
+		self.trace_file = None
+		self.trace = None
+
+
+BITMAP_TEXT_CACHE_SIZE = 256
+TEXT_CACHE_SIZE = 512
+# prebuilt glyph strips for the bitmap font: (color, scale) -> (Surface, {char: x offset})
+bitmap_glyph_atlases = {}
+# recently rendered bitmap strings: (text, color, scale, spacing) -> Surface
+bitmap_text_cache = SurfaceCache(BITMAP_TEXT_CACHE_SIZE)
+# recently rendered font strings: (font, text, color, wrap width, line spacing) -> Surface
+text_surface_cache = SurfaceCache(TEXT_CACHE_SIZE)
+
+
+def get_bitmap_glyph_atlas(color, scale):
+	# draw every BITMAP_FONT glyph once per color/scale into a single strip
+	key = (color, scale)
+	if key in bitmap_glyph_atlases:
+		return bitmap_glyph_atlases[key]
+	rows = 7
+	char_w = 5
+	glyph_w = char_w * scale
+	atlas = pygame.Surface((glyph_w * len(BITMAP_FONT), rows * scale), pygame.SRCALPHA)
+	offsets = {}
+	for i, (ch, pattern) in enumerate(BITMAP_FONT.items()):
+		x0 = i * glyph_w
+		offsets[ch] = x0
+		for y in range(rows):
+			row = pattern[y]
+			for bit in range(char_w):
+				if row & (1 << (char_w - 1 - bit)):
+					pygame.draw.rect(atlas, color, (x0 + bit * scale, y * scale, scale, scale))
+	bitmap_glyph_atlases[key] = (atlas, offsets)
+	return atlas, offsets
+
+
 def render_bitmap_text(text, color=(255, 255, 255), scale=2, spacing=1):
 	text = text.upper()
 	rows = 7
@@ -132,28 +379,32 @@ def render_bitmap_text(text, color=(255, 255, 255), scale=2, spacing=1):
 		scale = 1
 	if spacing < 0:
 		spacing = 0
+	color = tuple(color)
+	key = (text, color, scale, spacing)
+	surf = bitmap_text_cache.get(key)
+	if surf is not None:
+		return surf
 	# empty text -> return a tiny transparent surface
 	if not text:
 		height = max(1, rows * scale)
-		return pygame.Surface((1, height), pygame.SRCALPHA)
-	width = sum((char_w * scale) + spacing for _ in text) - spacing
-	height = max(1, rows * scale)
-	# clamp width to at least 1 to avoid pygame.error: Invalid resolution for Surface
-	if width < 1:
-		width = 1
-	surf = pygame.Surface((width, height), pygame.SRCALPHA)
-	x = 0
-	for ch in text:
-		pattern = BITMAP_FONT.get(ch, BITMAP_FONT.get('?', BITMAP_FONT[' ']))
-		for y in range(rows):
-			row = pattern[y]
-			for bit in range(char_w):
-				if row & (1 << (char_w - 1 - bit)):
-					rx = x + bit * scale
-					ry = y * scale
-					pygame.draw.rect(surf, color, (rx, ry, scale, scale))
-		x += char_w * scale + spacing
-	return surf
+		surf = pygame.Surface((1, height), pygame.SRCALPHA)
+	else:
+		width = sum((char_w * scale) + spacing for _ in text) - spacing
+		height = max(1, rows * scale)
+		# clamp width to at least 1 to avoid pygame.error: Invalid resolution for Surface
+		if width < 1:
+			width = 1
+		surf = pygame.Surface((width, height), pygame.SRCALPHA)
+		atlas, offsets = get_bitmap_glyph_atlas(color, scale)
+		glyph_w = char_w * scale
+		fallback = offsets.get('?', offsets[' '])
+		x = 0
+		for ch in text:
+			area = (offsets.get(ch, fallback), 0, glyph_w, height)
+			# glyphs never overlap, so a max-blend onto the blank surface copies pixels exactly
+			surf.blit(atlas, (x, 0), area, special_flags=pygame.BLEND_RGBA_MAX)
+			x += glyph_w + spacing
+	return bitmap_text_cache.put(key, surf)
 
 
 coin_surfaces = {}
@@ -194,215 +445,32 @@ def get_coin_surface(level):
 	return surf
 
 
-def add_coin_to_slots(slots, level):
-	# place a single coin of `level` into the first available slot
-	# prefer same-level slots with space, else empty slots
-	for s in slots:
-		if s.coin == level and s.count < SLOT_CAPACITY:
-			s.count += 1
-			return True
-	for s in slots:
-		if s.is_empty():
-			s.coin = level
-			s.count = 1
-			return True
-	return False
-
-
-def process_combines(slots, currency, prestige_mult):
-	# Process combines by promoting groups from slots into new coins (distributed across slots).
-	gained = 0
-	# Repeat until no promotions occur (to allow cascading across slots)
-	promoted_any = True
-	while promoted_any:
-		promoted_any = False
-		for s in slots:
-			if s.is_empty():
-				continue
-			if s.count >= SLOT_CAPACITY:
-				promos = s.count // SLOT_CAPACITY
-				s.count = s.count % SLOT_CAPACITY
-				# create `promos` coins of level s.coin+1
-				for _ in range(promos):
-					target_level = s.coin + 1
-					placed = add_coin_to_slots(slots, target_level)
-					# if unable to place (no free slot), place the promoted coin into this slot
-					if not placed:
-						# overwrite this slot with the promoted coin
-						s.coin = target_level
-						s.count = 1
-						gained += coin_value(target_level)
-						promoted_any = True
-					else:
-						gained += coin_value(target_level)
-						promoted_any = True
-				# if this slot emptied, mark empty
-				if s.count == 0:
-					s.coin = 0
-	gained = int(gained * prestige_mult)
-	currency += gained
-	return currency, gained
-
-
-def weighted_random_coin(*args, **kwargs):
-	"""Compatibility wrapper:
-	- New usage: weighted_random_coin(slots, cap=...)
-	- Old usage: weighted_random_coin(max_level=...)
-	"""
-	# detect old-style call
-	max_level = kwargs.get('max_level', None)
-	cap = kwargs.get('cap', None)
-	slots = None
-	if args:
-		first = args[0]
-		if isinstance(first, list):
-			slots = first
-		elif isinstance(first, int):
-			max_level = first
-
-	if slots is None:
-		# fallback to original fixed-weight behavior when called with max_level
-		if max_level is None:
-			max_level = 5
-		base_weights = [50, 30, 12, 6, 2]
-		weights = base_weights[:max_level]
-		return random.choices(range(1, len(weights) + 1), weights=weights, k=1)[0]
-
-	# New behavior: include baseline low levels (C1-C3) plus any levels present in slots,
-	# but ensure C1-C3 together have ~95% probability while higher levels share ~5%.
-	# Also respect placement availability (same-level slot with room or any empty slot).
-	present = {s.coin for s in slots if s.coin}
-	# baseline low levels (respect cap)
-	base_max = 3
-	if cap is not None:
-		base_max = min(base_max, cap)
-	base_levels = set(range(1, base_max + 1))
-	candidate_levels = sorted(present | base_levels)
-
-	def _can_place(level):
-		for s in slots:
-			if s.coin == level and s.count < SLOT_CAPACITY:
-				return True
-		for s in slots:
-			if s.is_empty():
-				return True
-		return False
-
-	# filter to only placeable levels
-	levels = [l for l in candidate_levels if _can_place(l)]
-	# if no placeable levels remain, try to find any placeable up to cap
-	if not levels:
-		max_try = cap if cap is not None else max(5, max(present) if present else 3)
-		found = None
-		for l in range(1, max_try + 1):
-			if _can_place(l):
-				found = l
-				break
-		if found is None:
-			return 1
-		levels = [found]
-
-	# Partition low (<=3) and high (>3)
-	low_levels = [l for l in levels if l <= 3]
-	high_levels = [l for l in levels if l > 3]
-
-	# Desired mass percents
-	LOW_MASS = 95.0
-	HIGH_MASS = max(0.0, 100.0 - LOW_MASS)
-
-	weights = []
-	if low_levels:
-		low_share = LOW_MASS / len(low_levels)
-	else:
-		low_share = 0.0
-
-	if high_levels:
-		min_high = min(high_levels)
-		raw = [DEAL_WEIGHT_DECAY ** (-(l - min_high)) for l in high_levels]
-		sum_raw = sum(raw)
-		scaled = [(r / sum_raw) * HIGH_MASS for r in raw]
-		high_map = dict(zip(high_levels, scaled))
-	else:
-		high_map = {}
-
-	for l in levels:
-		if l in low_levels:
-			weights.append(low_share)
-		else:
-			weights.append(high_map.get(l, 0.0))
-
-	return random.choices(levels, weights=weights, k=1)[0]
-
-
-def compute_spawn_probabilities(slots, cap=None):
-	"""Return a dict level → percent for spawn probabilities given current slots.
-	Mirrors the selection logic used by weighted_random_coin for the slots case.
-	"""
-	present = {s.coin for s in slots if s.coin}
-	base_max = 3
-	if cap is not None:
-		base_max = min(base_max, cap)
-	base_levels = set(range(1, base_max + 1))
-	candidate_levels = sorted(present | base_levels)
-
-	def _can_place(level):
-		for s in slots:
-			if s.coin == level and s.count < SLOT_CAPACITY:
-				return True
-		for s in slots:
-			if s.is_empty():
-				return True
-		return False
-
-	levels = [l for l in candidate_levels if _can_place(l)]
-	if not levels:
-		max_try = cap if cap is not None else max(5, max(present) if present else 3)
-		for l in range(1, max_try + 1):
-			if _can_place(l):
-				levels = [l]
-				break
-		if not levels:
-			return {1: 100.0}
-
-	low_levels = [l for l in levels if l <= 3]
-	high_levels = [l for l in levels if l > 3]
-
-	LOW_MASS = 95.0
-	HIGH_MASS = max(0.0, 100.0 - LOW_MASS)
-
-	weights = []
-	if low_levels:
-		low_share = LOW_MASS / len(low_levels)
-	else:
-		low_share = 0.0
-
-	if high_levels:
-		min_high = min(high_levels)
-		raw = [DEAL_WEIGHT_DECAY ** (-(l - min_high)) for l in high_levels]
-		sum_raw = sum(raw)
-		scaled = [(r / sum_raw) * HIGH_MASS for r in raw]
-		high_map = dict(zip(high_levels, scaled))
-	else:
-		high_map = {}
-
-	for l in levels:
-		if l in low_levels:
-			weights.append(low_share)
-		else:
-			weights.append(high_map.get(l, 0.0))
-
-	total = sum(weights)
-	if total <= 0:
-		return {1: 100.0}
-	probs = {l: (w / total) * 100.0 for l, w in zip(levels, weights)}
-	return probs
-
-
-def main():
+def main(record_path=None, seed=None, trace_path=None, fps=RENDER_FPS):
 	pygame.init()
 	screen = pygame.display.set_mode((WIDTH, HEIGHT))
 	pygame.display.set_caption("Combine them!")
 	clock = pygame.time.Clock()
+	# tracks which screen areas changed so frames only repaint/present those
+	tracker = DirtyTracker(screen.get_rect())
+	# per-phase frame timings: F3 shows them, F4 starts/stops a CSV trace (or --trace PATH)
+	profiler = FrameProfiler()
+	show_profiler = False
+	if trace_path:
+		profiler.start_trace(trace_path)
+
+	profiler_text = {"bucket": None, "lines": []}
+
+	def profiler_lines():
+		# overlay text, refreshed four times a second
+		bucket = int(time.monotonic() * 4)
+		if profiler_text["bucket"] != bucket:
+			lines = []
+			for phase in ("frame",) + FrameProfiler.PHASES:
+				p50, p99 = profiler.percentiles(phase)
+				lines.append(f"{phase:<9} p50 {p50:6.2f}  p99 {p99:6.2f} ms")
+			profiler_text["bucket"] = bucket
+			profiler_text["lines"] = lines
+		return profiler_text["lines"]
 
 	# robust font setup: choose available backend
 	use_freetype = False
@@ -437,7 +505,7 @@ def main():
 		small_font = None
 		big_font = None
 
-	def render_text(f, text, color=(255, 255, 255)):
+	def _render_text_uncached(f, text, color):
 		# if a pygame font backend is available, use it; otherwise fallback to bitmap
 		if f is None:
 			return render_bitmap_text(text, color=color, scale=2)
@@ -453,8 +521,31 @@ def main():
 			except Exception:
 				return render_bitmap_text(text, color=color, scale=2)
 
+	def render_text(f, text, color=(255, 255, 255)):
+		# cached: labels and HUD lines are redrawn every frame with the same text
+		key = (f, text, tuple(color), None, None)
+		surf = text_surface_cache.get(key)
+		if surf is None:
+			surf = text_surface_cache.put(key, _render_text_uncached(f, text, color))
+		return surf
+
+	def text_width(f, text, color):
+		# measure without rendering where the backend allows it
+		if f is not None:
+			try:
+				if use_freetype:
+					return f.get_rect(text).width
+				return f.size(text)[0]
+			except Exception:
+				pass
+		return render_text(f, text, color).get_width()
+
 	# wrapped text renderer: returns a surface constrained to max_width with word wrapping
 	def render_text_wrapped(f, text, color, max_width, line_spacing=6):
+		key = (f, text, tuple(color), max_width, line_spacing)
+		out = text_surface_cache.get(key)
+		if out is not None:
+			return out
 		words = str(text).split(' ')
 		lines = []
 		cur = ''
@@ -464,8 +555,7 @@ def main():
 			else:
 				test = w
 			# measure width
-			surf_test = render_text(f, test, color)
-			if surf_test.get_width() <= max_width:
+			if text_width(f, test, color) <= max_width:
 				cur = test
 			else:
 				if cur:
@@ -481,30 +571,16 @@ def main():
 		for s in line_surfs:
 			out.blit(s, (0, y))
 			y += s.get_height() + line_spacing
-		return out
+		return text_surface_cache.put(key, out)
 
-	# Draw the help popup (can be called from menu or game rendering)
-	def render_help_popup(hp):
-		if not hp:
-			return
-		r = hp.get("rect") if isinstance(hp, dict) else None
-		if r is None:
-			return
-		# dim background
-		over = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-		over.fill((0, 0, 0, 160))
-		screen.blit(over, (0, 0))
-		pygame.draw.rect(screen, (36,36,44), (r.x, r.y, r.width, r.height), border_radius=8)
-		pygame.draw.rect(screen, (200,200,220), (r.x, r.y, r.width, r.height), 2, border_radius=8)
-		# title
-		title = render_text(big_font or font, "Help & Mechanics", (230,220,200))
-		screen.blit(title, (r.x + 20, r.y + 12))
-		# build help lines (same as in main help code)
-		max_tt = max_time_thief_count()
+	# help text lines (depend on the current state: upgrade counts and spawn odds)
+	def help_lines():
+		max_tt = state.max_time_thief_count()
 		lines = [
 			"- Deals spawn coins only (one per unlocked slot).",
 			"- Selling coins opens the sell popup and grants currency.",
 			f"- Worker: buy for {WORKER_COST} and toggle On/Off; when enabled it auto-deals every 2x manual cooldown by default.",
+			f"- An enabled worker keeps dealing while the game is closed: up to {OFFLINE_MAX_DEALS} deals, made when the save is loaded.",
 			f"- Worker Upgrade: available after buying {max_tt} Time Thiefs; cost = {WORKER_UPGRADE_COST}; makes the worker use the same cooldown as manual.",
 			f"- Time Thief: cost = {TIME_THIEF_COST}; each reduces the manual deal cooldown by {TIME_THIEF_REDUCTION:.2f}s (min {MIN_DEAL_COOLDOWN:.2f}s).",
 			"- Worker deals do not directly award currency; sell coins to realize value.",
@@ -512,6 +588,7 @@ def main():
 			"Controls:",
 			"  - Press H to open/close this Help window (Help pauses worker and blocks Space).",
 			"  - Press Space to perform a Manual Deal (disabled while Worker is enabled or Help is open).",
+			"  - Press F3 to show frame timings, F4 to start/stop recording them to a CSV file.",
 			"  - Ctrl+Click a slot to instantly sell 1 (identical to Sell -> 1).",
 			"",
 			f"Flow: Deal → Combine → Sell (sell to convert coins into currency).",
@@ -519,10 +596,32 @@ def main():
 			"",
 			"Spawn probabilities (current):",
 		]
-		prob_cap = min(max(3, max((s.coin for s in slots), default=0) + 1), unlocked_slots + 2)
-		probs = compute_spawn_probabilities(slots, cap=prob_cap)
+		# same cap as a deal, so this reads the deal's cached distribution
+		probs = compute_spawn_probabilities(state.slots, cap=state.deal_cap())
 		for lvl in sorted(probs.keys()):
 			lines.append(f"  C{lvl}: {probs[lvl]:.1f}%")
+		return lines
+
+	def help_signature(hp):
+		return (hp.get("scroll", 0), tuple(help_lines()))
+
+	# Draw the help popup (can be called from menu or game rendering)
+	def render_help_popup(hp):
+		if not hp:
+			return
+		r = hp.get("rect") if isinstance(hp, dict) else None
+		if r is None:
+			return
+		# dim background
+		over = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+		over.fill((0, 0, 0, 160))
+		screen.blit(over, (0, 0))
+		pygame.draw.rect(screen, (36,36,44), (r.x, r.y, r.width, r.height), border_radius=8)
+		pygame.draw.rect(screen, (200,200,220), (r.x, r.y, r.width, r.height), 2, border_radius=8)
+		# title
+		title = render_text(big_font or font, "Help & Mechanics", (230,220,200))
+		screen.blit(title, (r.x + 20, r.y + 12))
+		lines = help_lines()
 
 		# Render wrapped lines into a content surface and blit viewport
 		content_x = r.x + 20
@@ -576,9 +675,86 @@ def main():
 			pygame.draw.rect(screen, (200,200,220), cr, 2, border_radius=6)
 			cs = render_text(small_font or font, "Close", (255,255,255))
 			screen.blit(cs, (cr.x + (cr.width - cs.get_width())//2, cr.y + (cr.height - cs.get_height())//2))
+
+	def make_load_popup():
+		# previews come from the store's index; no save is read until one is picked
+		entries = store.entries()[:LOAD_POPUP_ROWS]
+		pw = 640
+		ph = 132 + max(1, len(entries)) * 52
+		mx0 = (WIDTH - pw) // 2
+		my0 = (HEIGHT - ph) // 2
+		rows = [{"rect": pygame.Rect(mx0 + 20, my0 + 60 + i * 52, pw - 40, 44), "entry": e} for i, e in enumerate(entries)]
+		close_rect = pygame.Rect(mx0 + pw - 120, my0 + ph - 52, 100, 40)
+		return {"rect": pygame.Rect(mx0, my0, pw, ph), "rows": rows, "close": close_rect}
+
+	def render_load_popup(lp):
+		r = lp["rect"]
+		over = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+		over.fill((0, 0, 0, 160))
+		screen.blit(over, (0, 0))
+		pygame.draw.rect(screen, (36,36,44), r, border_radius=8)
+		pygame.draw.rect(screen, (200,200,220), r, 2, border_radius=8)
+		title = render_text(big_font or font, "Load Save", (230,220,200))
+		screen.blit(title, (r.x + 20, r.y + 12))
+		if not lp["rows"]:
+			msg = render_text(small_font or font, "No saves yet", (200,200,200))
+			screen.blit(msg, (r.x + 20, r.y + 72))
+		for row in lp["rows"]:
+			e = row["entry"]
+			rr = row["rect"]
+			checkpoint = e["kind"] == savefile.KIND_CHECKPOINT
+			pygame.draw.rect(screen, (50,60,80) if checkpoint else (60,100,140), rr, border_radius=6)
+			pygame.draw.rect(screen, (200,200,220), rr, 2, border_radius=6)
+			name = render_text(small_font or font, e["name"], (255,255,255))
+			screen.blit(name, (rr.x + 12, rr.y + (rr.height - name.get_height())//2))
+			saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(e["saved_at"]))
+			info = f"Top {format_coin_label(e['top_coin'])}  Prestige {e['prestige_level']}  Currency {e['currency']}  {saved}"
+			info_s = render_text(small_font or font, info, (210,210,210))
+			screen.blit(info_s, (rr.right - 12 - info_s.get_width(), rr.y + (rr.height - info_s.get_height())//2))
+		cr = lp["close"]
+		pygame.draw.rect(screen, (60,100,140), cr, border_radius=6)
+		pygame.draw.rect(screen, (200,200,220), cr, 2, border_radius=6)
+		cs = render_text(small_font or font, "Close", (255,255,255))
+		screen.blit(cs, (cr.x + (cr.width - cs.get_width())//2, cr.y + (cr.height - cs.get_height())//2))
+
+	# Market chart layer: price_history only changes when a new sample is taken
+	# (about once a second), so the plot is kept on a surface and rebuilt only then.
+	chart_layer = {"key": None, "surf": None}
+	def render_chart(size):
+		key = (state.price_version, size)
+		if chart_layer["key"] == key:
+			return chart_layer["surf"]
+		chart_w, chart_h = size
+		surf = pygame.Surface(size)
+		surf.fill((18, 18, 24))
+		pygame.draw.rect(surf, (90,90,100), (0, 0, chart_w, chart_h), 1)
+		# gather levels to plot (up to 6)
+		plot_levels = sorted(state.price_history.keys())[-6:]
+		colors = [(220,180,60),(180,220,100),(160,160,240),(240,160,200),(200,200,200),(180,140,220)]
+		if plot_levels:
+			# find max price in history window
+			views = {l: state.price_history[l].view() for l in plot_levels}
+			mxp = max(max(views[l]) if views[l] else 1 for l in plot_levels)
+			for i, lvl in enumerate(plot_levels):
+				hist = views[lvl]
+				if not hist:
+					continue
+				col = colors[i % len(colors)]
+				if len(hist) > 1:
+					points = [
+						(int(j/state.price_history_max * chart_w), chart_h - int((p/mxp) * (chart_h-8)) - 4)
+						for j, p in enumerate(hist)
+					]
+					pygame.draw.lines(surf, col, False, points, 2)
+				# label
+				lbl = render_text(small_font or font, f"C{lvl}", col)
+				surf.blit(lbl, (chart_w - 40, 4 + i*14))
+		chart_layer["key"] = key
+		chart_layer["surf"] = surf
+		return surf
+
 	# UI buttons
 	btn_deal = make_button((50, 600, 160, 40), "Deal Coins")
-	btn_buy_slot = make_button((230, 600, 160, 40), "Buy Slot")
 	btn_prestige = make_button((410, 600, 160, 40), "Prestige")
 	btn_save = make_button((50, 650, 120, 34), "Save")
 	btn_load = make_button((190, 650, 120, 34), "Load")
@@ -607,23 +783,88 @@ def main():
 	prestige_popup = None
 	exit_menu_popup = None
 	help_popup = None
-
-	# game state
-	slots = [Slot() for _ in range(INITIAL_SLOTS)]
-	unlocked_slots = INITIAL_SLOTS
-	currency = 2500
-	prestige_mult = 1.0
-	prestige_level = 0
-	# Worker upgrade state
-	worker_owned = False
-	worker_enabled = False
-	worker_last_deal_time = pygame.time.get_ticks() / 1000.0
-
-	# Time Thief upgrade state (reduces cooldowns)
-	time_thief_count = 0
-
-	# Worker upgrade state: when True, worker uses same cooldown as manual (not 2x)
-	worker_upgraded = False
+	load_popup = None
+
+	# game state (rules and all game data live in engine.GameState)
+	def sim_clock():
+		# (step, time) of the simulation step the game clock is in
+		step = pygame.time.get_ticks() * SIM_HZ // 1000
+		return step, step / SIM_HZ
+
+	def wait_for_events(wake_at):
+		# idle: block until input arrives or the game clock reaches `wake_at` (None: no deadline)
+		if wake_at is None:
+			return [pygame.event.wait()] + pygame.event.get()
+		ms = math.ceil(wake_at * SIM_HZ) * 1000 // SIM_HZ - pygame.time.get_ticks()
+		if ms > 0:
+			event = pygame.event.wait(ms)
+			if event.type != pygame.NOEVENT:
+				return [event] + pygame.event.get()
+		return pygame.event.get()
+
+	# game time used by everything this loop iteration (read once, at the top)
+	sim_step, sim_now = sim_clock()
+	state = GameState(seed)
+	state.worker_last_deal_time = sim_now
+	# named save profiles (plus prestige checkpoints), one file each
+	store = savefile.SaveStore(os.path.join(os.path.dirname(__file__), "saves"))
+	if not store.entries():
+		# single-file saves of earlier versions become the "default" profile
+		for path in ("save.dat", "save.json"):
+			path = os.path.join(os.path.dirname(__file__), path)
+			if os.path.exists(path) and store.import_file("default", path):
+				break
+	# profile the running game saves to (set by New Game / Load Save)
+	profile = None
+	# saves (periodic and explicit) are written on a background thread
+	saver = AutoSaver(store)
+	last_autosave = 0.0
+
+	# every game action goes through dispatch() as an actionlog command,
+	# so a session can be recorded (--record PATH) and replayed headlessly
+	recorder = None
+	if record_path:
+		recorder = actionlog.Recorder(state, record_path)
+		recorder.checkpoint(sim_now)
+
+	def dispatch(cmd):
+		result = actionlog.apply(state, cmd)
+		if recorder is not None:
+			recorder.record(cmd, result)
+		return result
+
+	def take_snapshot():
+		return savefile.snapshot(state, sim_now, time.time())
+
+	def load_saved_game(name):
+		# load (and catch up the worker) off the UI thread, after pending writes land.
+		# Only a load at startup catches up: later in the session the time since the
+		# save was spent in this game, not away from it.
+		return SaveLoader(saver, name, state, sim_now, catch_up=not played)
+
+	def message_box_rect(lines):
+		box = pygame.Rect(0, 0, 460, 28 + 28 * len(lines))
+		box.center = screen.get_rect().center
+		return box
+
+	def draw_message_box(lines):
+		# centered box with a few lines of text; returns its rect
+		box = message_box_rect(lines)
+		pygame.draw.rect(screen, (40, 40, 60), box, border_radius=8)
+		pygame.draw.rect(screen, (200, 200, 220), box, 2, border_radius=8)
+		for i, text in enumerate(lines):
+			lbl = render_text(small_font or font, text, (230, 220, 200))
+			screen.blit(lbl, (box.centerx - lbl.get_width() // 2, box.y + 16 + i * 28))
+		return box
+
+	# the SaveLoader of a load in progress; the game waits for it
+	loader = None
+	# whether a game has been started or loaded in this session
+	played = False
+	# the Save button's write is queued; its result shows when it is done
+	save_feedback = False
+	# {"text", "until"}: a message shown at the top of the board for a while
+	notice = None
 
 	# dragging state
 	dragging = False
@@ -636,157 +877,102 @@ def main():
 	# sell popup when shift+clicking a slot
 	sell_popup = None  # {'level': int, 'rect': Rect, 'sell1':Rect,'sell5':Rect,'sell_all':Rect}
 
-	# market price history for chart: level -> list of recent displayed prices
-	price_history = {}
-	price_history_max = 80
-
-	# recent sales history used for pricing: level -> deque of last ~1000 sale prices
-	from collections import deque, defaultdict
-	market_sales_history = defaultdict(lambda: deque(maxlen=1000))
-	# parallel timestamps for recent sales to compute volume-driven effects
-	market_sales_timestamps = defaultdict(lambda: deque(maxlen=1000))
-	# how strongly player sales affect market history (higher -> bigger immediate impact)
-	SELL_IMPACT_MULTIPLIER = 5
-
-	# computed current prices (updated on actions)
-	current_prices = {}
-
-	# price update throttle (seconds) - update every 1s per request
-	price_update_interval = 1.0
-	last_price_update = 0.0
-	# deal cooldown (base seconds)
-	deal_cooldown = 5.0
-	def effective_deal_cooldown():
-		return max(MIN_DEAL_COOLDOWN, deal_cooldown - time_thief_count * TIME_THIEF_REDUCTION)
-
-	def max_time_thief_count():
-		# compute how many Time Thiefs can be purchased before reaching MIN_DEAL_COOLDOWN
-		maxc = int((deal_cooldown - MIN_DEAL_COOLDOWN) / TIME_THIEF_REDUCTION)
-		return max(0, maxc)
-	last_deal_time = -9999.0
-
-	def update_market_prices():
-		# compute prices from recent sales history and recent sale volume
-		max_samples = 100
-		# shorten lookback so prices recover faster after a sell
-		lookback_secs = 30.0
-		# include levels from recent sales so chart updates even after the player no longer holds that coin
-		now_ts = pygame.time.get_ticks() / 1000.0
-		levels_set = set()
-		for s in slots:
-			if s.coin:
-				levels_set.add(s.coin)
-		# include any levels with recent sales history
-		for k in market_sales_history.keys():
-			if k:
-				levels_set.add(k)
-		# always include lowest few levels for display
-		for i in range(1, 4):
-			levels_set.add(i)
-		levels = sorted(levels_set)
-		for lvl in levels:
-			price_hist = list(market_sales_history.get(lvl, []))
-			ts_hist = list(market_sales_timestamps.get(lvl, []))
-			# prefer only fairly recent sales for base price to allow faster recovery
-			recent_window = lookback_secs * 2.0
-			recent_samples = [p for p, t in zip(price_hist, ts_hist) if now_ts - t <= recent_window]
-			if recent_samples:
-				base_price = int(sum(recent_samples[-max_samples:]) / len(recent_samples[-max_samples:]))
-			elif price_hist:
-				# if there are historical sales but none recent, blend older average with base coin value
-				older = price_hist[-max_samples:]
-				older_avg = int(sum(older) / len(older))
-				base_price = int(0.4 * older_avg + 0.6 * coin_value(lvl))
-			else:
-				base_price = coin_value(lvl)
-			# compute recent sale volume in lookback window
-			recent_sales_count = 0
-			for t in reversed(ts_hist):
-				if now_ts - t <= lookback_secs:
-					recent_sales_count += 1
-				else:
-					break
-			# demand factor decreases as recent sales increase
-			demand = max(0.3, 1.2 - (recent_sales_count / (10.0 + lvl)))
-			# small noise
-			noise = random.uniform(-0.02, 0.02)
-			price = int(base_price * demand * (1.0 + noise))
-			current_prices[lvl] = max(1, price)
-			# append to small chart history so chart reflects price movements
-			if lvl not in price_history:
-				price_history[lvl] = []
-			price_history[lvl].append(current_prices[lvl])
-			if len(price_history[lvl]) > price_history_max:
-				price_history[lvl].pop(0)
-
 	# misc UI/game flags
 	no_moves = False
 	highest_purchasable = 3
 
-	def slot_rect(index):
-		slot_w = 140
-		slot_h = 140
-		margin = 20
-		# horizontal padding from screen edges
-		left_pad = 50
-		right_pad = 50
-		available_width = WIDTH - left_pad - right_pad
-		# compute maximum columns that fit given slot width+margin
-		max_cols = max(1, int((available_width + margin) // (slot_w + margin)))
-		# cap columns to a sensible maximum so rows wrap earlier on wide screens
-		max_cols = min(max_cols, MAX_SLOTS_PER_ROW)
-		# number of columns we'll use (don't exceed unlocked_slots)
-		cols = min(max_cols, max(1, unlocked_slots))
-		# ensure the computed cols actually fits in the available width
-		while cols > 1 and (cols * slot_w + (cols - 1) * margin) > available_width:
-			cols -= 1
-		# which row and column this index is in
-		row = index // cols
-		col = index % cols
-		# compute how many items are in this row (last row may be shorter)
-		items_in_row = cols
-		# if this is the last row, it might have fewer items
-		total_rows = (unlocked_slots + cols - 1) // cols
-		if row == total_rows - 1:
-			# items remaining
-			items_in_row = max(1, unlocked_slots - row * cols)
-		# center the row horizontally
-		row_width = items_in_row * slot_w + max(0, items_in_row - 1) * margin
-		x_start = left_pad + (available_width - row_width) // 2
-		x = x_start + col * (slot_w + margin)
-		y = 50 + row * (slot_h + margin)
-		return pygame.Rect(x, y, slot_w, slot_h)
-
-	# helpers to detect if a coin of `level` can be placed (without mutating state)
-	def can_place_level(level):
-		for s in slots:
-			if s.coin == level and s.count < SLOT_CAPACITY:
-				return True
-		for s in slots:
-			if s.is_empty():
-				return True
-		return False
-
-	def any_place_up_to(max_level):
-		for lvl in range(1, max_level + 1):
-			if can_place_level(lvl):
-				return True
-		return False
+	# slot rects are laid out once per board and window size, not on every call
+	slot_layouts = {}
+
+	def slot_layout():
+		key = (state.unlocked_slots, len(state.slots), screen.get_size())
+		layout = slot_layouts.get(key)
+		if layout is None:
+			layout = slot_layouts[key] = SlotLayout(*key)
+		return layout
 
+	def slot_rect(index):
+		return slot_layout().rects[index]
+
+	# timers (market refresh, worker deals, autosave) wait in a priority queue
+	# and fire on the simulation step they fall due, however often we render
+	timers = TimerQueue()
+	timer_deadlines = {}
+
+	def reschedule():
+		# requeue the deadlines that moved since the last call
+		for name, due in (
+			("market", state.market_due()),
+			# Help pauses the worker
+			("worker", None if help_popup else state.worker_due()),
+			("autosave", None if menu_active else last_autosave + AUTOSAVE_INTERVAL),
+		):
+			if timer_deadlines.get(name) != due:
+				timer_deadlines[name] = due
+				timers.set(name, due)
+
+	menu_active = True
+	last_step = sim_step
+	# game time the loop may sleep until before its next iteration (None: until input)
+	wake_at = sim_now
 	running = True
-	last_gain = 0
 
 	while running:
-		dt = clock.tick(60) / 1000.0
+		profiler.begin_frame()
+		clock.tick(fps)
+		events = wait_for_events(wake_at)
+		profiler.mark("wait")
+		last_step = sim_step
+		sim_step, sim_now = sim_clock()
+		# no sleeping next time unless this iteration finds the screen settled
+		wake_at = sim_now
+
+		if save_feedback:
+			saved = saver.poll()
+			if saved is not None:
+				# last_gain shows the result of the Save button
+				state.last_gain = 0 if saved else -1
+				save_feedback = False
+
+		if loader is not None:
+			# a save is loading: ignore input until it is in (its thread wakes us when done)
+			if any(event.type == pygame.QUIT for event in events):
+				running = False
+				continue
+			if not loader.done():
+				lines = [f"Loading {loader.name}..."]
+				if loader.catch_up:
+					lines.append("(the worker is catching up on the time away)")
+				tracker.begin()
+				tracker.track("loading", message_box_rect(lines), tuple(lines))
+				if tracker.end():
+					pygame.display.update(draw_message_box(lines))
+				wake_at = None
+				continue
+			if loader.finish(state, sim_now):
+				if recorder is not None:
+					recorder.checkpoint(sim_now)
+				# a checkpoint ("<profile>@prestige<n>") continues its profile
+				profile = loader.name.split("@")[0]
+				last_autosave = sim_now
+				menu_active = False
+				played = True
+				if state.last_catchup:
+					deals, skipped = state.last_catchup
+					text = f"While you were away the worker made {deals} deals"
+					if skipped:
+						text += f" (the most it makes offline; {skipped} more were missed)"
+					notice = {"text": text, "until": sim_now + NOTICE_SECONDS}
+			loader = None
 
 		# --- Main menu handling: process events and draw menu, skipping gameplay while active ---
-		if 'menu_active' not in locals():
-			menu_active = True
 		if menu_active:
-			for event in pygame.event.get():
+			for event in events:
 				if event.type == pygame.QUIT:
 					running = False
 					break
+				elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+					tracker.invalidate()
 				elif event.type == pygame.KEYDOWN:
 					if event.key == pygame.K_h:
 						# toggle help popup while in menu
@@ -830,41 +1016,28 @@ def main():
 							traceback.print_exc()
 							help_popup = None
 							continue
+					if load_popup:
+						if load_popup["rect"].collidepoint((mx, my)) and not load_popup["close"].collidepoint((mx, my)):
+							for row in load_popup["rows"]:
+								if row["rect"].collidepoint((mx, my)):
+									loader = load_saved_game(row["entry"]["name"])
+									load_popup = None
+									break
+						else:
+							# close button or clicked outside
+							load_popup = None
+						continue
 					if btn_menu_new["rect"].collidepoint((mx, my)):
-						# start a fresh game
-						slots = [Slot() for _ in range(INITIAL_SLOTS)]
-						unlocked_slots = INITIAL_SLOTS
-						currency = 2500
-						prestige_mult = 1.0
-						prestige_level = 0
-						worker_owned = False
-						worker_enabled = False
-						worker_last_deal_time = pygame.time.get_ticks() / 1000.0
-						time_thief_count = 0
-						worker_upgraded = False
+						# start a fresh game in a new profile
+						dispatch(NewGame(sim_now))
+						profile = store.new_profile_name()
+						last_autosave = sim_now
 						menu_active = False
+						played = True
 						continue
 					if btn_menu_load["rect"].collidepoint((mx, my)):
-						# load from save if present
-						save_path = os.path.join(os.path.dirname(__file__), "save.json")
-						data = load_game(save_path)
-						if data:
-							loaded_slots = int(data.get("unlocked_slots", INITIAL_SLOTS))
-							loaded_slots = max(INITIAL_SLOTS, min(MAX_SLOTS, loaded_slots))
-							slots = [Slot() for _ in range(loaded_slots)]
-							for i, sdata in enumerate(data.get("slots", [])):
-								if i < len(slots):
-									slots[i].coin = sdata.get("coin", 0)
-									slots[i].count = sdata.get("count", 0)
-							unlocked_slots = loaded_slots
-							currency = data.get("currency", 0)
-							prestige_level = data.get("prestige_level", 0)
-							prestige_mult = 1.0 + prestige_level * 0.1
-							worker_owned = data.get("worker_owned", False)
-							worker_enabled = data.get("worker_enabled", False)
-							worker_upgraded = data.get("worker_upgraded", False)
-							time_thief_count = data.get("time_thief_count", 0)
-							menu_active = False
+						# pick a save to load
+						load_popup = make_load_popup()
 						continue
 					if btn_menu_help["rect"].collidepoint((mx, my)):
 						pw, ph = 640, 360
@@ -877,7 +1050,20 @@ def main():
 						running = False
 						break
 
-			# draw menu
+			if menu_active:
+				# the menu only changes on input
+				wake_at = None
+
+			# draw menu (static, so only repaint when it first shows or the help popup changes)
+			tracker.begin()
+			tracker.track("menu", screen.get_rect())
+			if help_popup:
+				tracker.track("help", screen.get_rect(), help_signature(help_popup))
+			if load_popup:
+				tracker.track("load_popup", screen.get_rect(), tuple(row["entry"]["name"] for row in load_popup["rows"]))
+			dirty = tracker.end()
+			if not dirty:
+				continue
 			screen.fill((24, 24, 30))
 			title = render_text(big_font or font, "Combiner — Main Menu", (230,220,200))
 			screen.blit(title, ((WIDTH - title.get_width())//2, 140))
@@ -887,52 +1073,55 @@ def main():
 				pygame.draw.rect(screen, (200,200,220), b["rect"], 2, border_radius=8)
 				lbl = render_text(small_font or font, b["label"], (255,255,255))
 				screen.blit(lbl, (b["rect"].x + (b["rect"].width - lbl.get_width())//2, b["rect"].y + (b["rect"].height - lbl.get_height())//2))
-			# if help is open, let the later Help rendering code draw it (we still call flip here to remain responsive)
+			if load_popup:
+				render_load_popup(load_popup)
 			if help_popup:
 				render_help_popup(help_popup)
-			pygame.display.flip()
+			pygame.display.update(dirty)
+			profiler.mark("menu")
 			continue
 
-		# compute dynamic buy options each frame
-		current_max = 0
-		for s in slots:
-			if s.coin > current_max:
-				current_max = s.coin
-		# highest purchasable is always one below current highest merged
-		if current_max >= 1:
-			highest_purchasable = max(1, current_max - 1)
-		else:
-			highest_purchasable = 1
-		buy_levels = [max(1, highest_purchasable - 2), max(1, highest_purchasable - 1), highest_purchasable]
-
-		# allow dealing to spawn coins up to one level above current_max (no hard cap)
-		max_deal_level = max(3, current_max + 1, unlocked_slots)
-
+		# run the timers that fell due since the last iteration, in deadline order
+		reschedule()
+		entry = timers.pop(sim_now)
+		while entry is not None:
+			name, due = entry
+			# first step at or after the deadline (not before the last iteration's step)
+			step = min(max(math.ceil(due * SIM_HZ), last_step), sim_step)
+			t = step / SIM_HZ
+			if name == "market":
+				fired = dispatch(MarketTick(t))
+			elif name == "worker":
+				fired = dispatch(WorkerTick(t))
+			else:
+				# periodic autosave: snapshot here, serialize and write on the saver thread
+				saver.submit(profile, take_snapshot())
+				last_autosave = t
+				fired = True
+			if not fired:
+				# float rounding left the step a hair short of the deadline: retry on the next one
+				timers.set(name, (step + 1) / SIM_HZ)
+			reschedule()
+			entry = timers.pop(sim_now)
+		profiler.mark("timers")
+
+		# buy options, slot cost and no-move detection (kept by the state until the board, slots or currency change)
+		derived = state.derived()
+		highest_purchasable = derived.highest_purchasable
+		buy_levels = derived.buy_levels
+		slot_cost = derived.slot_cost
 		# detect no-move (can't place any reasonable coin and can't afford a slot)
-		# make slots more expensive (higher base)
-		slot_cost = 200 * (2 ** (unlocked_slots - INITIAL_SLOTS))
-		has_place = any_place_up_to(max_deal_level)
-		no_moves = (not has_place) and (currency < slot_cost)
-
-		# compute supply per level (for UI counts only)
-		supply = {}
-		max_display_level = max(3, current_max)
-		for lvl in range(1, max_display_level + 1):
-			supply[lvl] = sum(s.count for s in slots if s.coin == lvl)
-		# periodic backup update if there are no recorded market prices yet
-		now = pygame.time.get_ticks() / 1000.0
-		if not current_prices:
-			update_market_prices()
-		# periodic market price recalculation (every interval)
-		if now - last_price_update >= price_update_interval:
-			update_market_prices()
-			last_price_update = now
+		no_moves = derived.no_moves
+		profiler.mark("state")
 
 		# sell popup state is managed via `sell_popup`; cleared by clicks elsewhere
 
-		for event in pygame.event.get():
+		for event in events:
 			if event.type == pygame.QUIT:
 				running = False
+			elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+				# window contents were lost (uncovered/restored): repaint everything
+				tracker.invalidate()
 			elif event.type == pygame.KEYDOWN:
 				# Toggle help with H key (same as clicking Help button)
 				if event.key == pygame.K_h:
@@ -945,6 +1134,16 @@ def main():
 						close_rect = pygame.Rect(mx0 + pw - 120, my0 + ph - 52, 100, 40)
 						help_popup = {"rect": pygame.Rect(mx0, my0, pw, ph), "close": close_rect, "scroll": 0}
 					continue
+				# F3: frame-time overlay, F4: start/stop writing frametrace-<time>.csv
+				elif event.key == pygame.K_F3:
+					show_profiler = not show_profiler
+					continue
+				elif event.key == pygame.K_F4:
+					if profiler.trace is None:
+						profiler.start_trace(os.path.join(os.path.dirname(__file__), time.strftime("frametrace-%Y%m%d-%H%M%S.csv")))
+					else:
+						profiler.stop_trace()
+					continue
 				# Escape: prompt to return to main menu (ask to save)
 				elif event.key == pygame.K_ESCAPE:
 					# open confirm popup asking to Save & Exit / Exit without saving / Cancel
@@ -958,24 +1157,11 @@ def main():
 					continue
 				# Space triggers Deal (same as clicking Deal), unless Worker is enabled
 				elif event.key == pygame.K_SPACE:
-					if worker_enabled or help_popup:
+					if state.worker_enabled or help_popup:
 						# ignore space while worker auto-deal is active or Help open
 						continue
-					now_click = pygame.time.get_ticks() / 1000.0
-					# use effective cooldown (reduced by Time Thief purchases)
-					eff_cd = effective_deal_cooldown()
-					if now_click - last_deal_time >= eff_cd:
-						# deal one coin per unlocked slot
-						for _ in range(unlocked_slots):
-							lvl = weighted_random_coin(slots, cap=min(max_deal_level, unlocked_slots + 2))
-							add_coin_to_slots(slots, lvl)
-						# process combines but do NOT grant currency for deal-triggered combines
-						_ , _ = process_combines(slots, currency, prestige_mult)
-						last_gain = 0
-						last_deal_time = now_click
-					else:
-						# still cooling down; ignore
-						pass
+					# deal one coin per unlocked slot (ignored while cooling down)
+					dispatch(Deal(sim_now))
 					continue
 			elif event.type == pygame.MOUSEWHEEL:
 				# scroll help popup content when wheel used over the popup
@@ -1009,31 +1195,15 @@ def main():
 					restart_rect = pygame.Rect(mx0 + 360, my0 + 80, 140, 48)
 					if buy_rect.collidepoint((mx, my)):
 						# attempt buy slot
-						if currency >= slot_cost and unlocked_slots < MAX_SLOTS:
-							currency -= slot_cost
-							slots.append(Slot())
-							unlocked_slots += 1
+						dispatch(BuySlot(sim_now))
 						continue
 					elif sell_rect.collidepoint((mx, my)):
 						# sell one coin from the highest-level non-empty slot
-						best = None
-						for i, s in enumerate(slots):
-							if not s.is_empty() and s.count > 0:
-								if best is None or s.coin > slots[best].coin:
-									best = i
-						if best is not None:
-							lvl = slots[best].coin
-							slots[best].count -= 1
-							if slots[best].count == 0:
-								slots[best].coin = 0
-							currency += coin_value(lvl) // 2
+						dispatch(SellHighestAtHalf(sim_now))
 						continue
 					elif restart_rect.collidepoint((mx, my)):
 						# restart current run (preserve prestige)
-						slots = [Slot() for _ in range(INITIAL_SLOTS)]
-						unlocked_slots = INITIAL_SLOTS
-						currency = 0
-						last_gain = 0
+						dispatch(RestartRun(sim_now))
 						continue
 				# otherwise normal click handling follows
 				# handle help popup first (blocks other UI) with defensive checks
@@ -1061,9 +1231,8 @@ def main():
 					if exit_menu_popup["rect"].collidepoint((mx, my)):
 						# Save & Exit
 						if exit_menu_popup["save"].collidepoint((mx, my)):
-							save_path = os.path.join(os.path.dirname(__file__), "save.json")
-							saved = save_game(save_path, slots, unlocked_slots, currency, prestige_level, worker_owned, worker_enabled, time_thief_count, worker_upgraded)
-							# go to main menu regardless (saved or not)
+							# queued, not waited for; go to main menu regardless
+							saver.submit(profile, take_snapshot())
 							exit_menu_popup = None
 							menu_active = True
 						# Exit without saving
@@ -1082,13 +1251,9 @@ def main():
 						# Yes/No buttons
 						if prestige_popup["yes"].collidepoint((mx, my)):
 							# perform prestige
-							if unlocked_slots > INITIAL_SLOTS or currency >= 1000:
-								prestige_level += 1
-								prestige_mult = 1.0 + prestige_level * 0.1
-								currency = 0
-								slots = [Slot() for _ in range(INITIAL_SLOTS)]
-								unlocked_slots = INITIAL_SLOTS
-								last_gain = 0
+							if dispatch(Prestige(sim_now)):
+								# keep a checkpoint of every prestige next to the profile
+								saver.submit(f"{profile}@prestige{state.prestige_level}", take_snapshot(), savefile.KIND_CHECKPOINT)
 							# close popup after choice
 							prestige_popup = None
 						elif prestige_popup["no"].collidepoint((mx, my)):
@@ -1098,36 +1263,19 @@ def main():
 						prestige_popup = None
 					continue
 				# check for slot click to start dragging (priority)
-				clicked_slot = None
-				for i in range(len(slots)):
-					rect = slot_rect(i)
-					if rect.collidepoint((mx, my)) and i < unlocked_slots and not slots[i].is_empty():
-						clicked_slot = i
-						break
+				clicked_slot = slot_layout().cell_at((mx, my))
+				if clicked_slot is not None and (clicked_slot >= state.unlocked_slots or state.slots[clicked_slot].is_empty()):
+					clicked_slot = None
 				# Shift+click opens sell popup for that slot
 				mods = pygame.key.get_mods()
 				if clicked_slot is not None and not dragging:
 					# Ctrl+Click: quick-sell one from the stack
 					if mods & pygame.KMOD_CTRL:
 						# perform the same action as the sell-popup "Sell 1": apply current market price and impact
-						lvl = slots[clicked_slot].coin
-						price = current_prices.get(lvl, coin_value(lvl))
-						if slots[clicked_slot].count > 0:
-							slots[clicked_slot].count -= 1
-							if slots[clicked_slot].count == 0:
-								slots[clicked_slot].coin = 0
-							currency += price
-							# record sale impact on market history/timestamps
-							for _ in range(SELL_IMPACT_MULTIPLIER):
-								market_sales_history[lvl].append(price)
-								_market_now = pygame.time.get_ticks() / 1000.0
-								for _ in range(SELL_IMPACT_MULTIPLIER):
-									market_sales_timestamps[lvl].append(_market_now)
-							# update market prices after sale
-							update_market_prices()
+						dispatch(Sell(sim_now, clicked_slot, 1, None))
 						continue
 					if mods & pygame.KMOD_SHIFT:
-						lvl = slots[clicked_slot].coin
+						lvl = state.slots[clicked_slot].coin
 						# popup near slot (larger so value text and buttons don't overlap)
 						rect = slot_rect(clicked_slot)
 						pw, ph = 300, 64
@@ -1140,38 +1288,18 @@ def main():
 						sell_popup = {"level": lvl, "slot": clicked_slot, "rect": r, "sell1": r1, "sell5": r5, "sell_all": rall}
 						continue
 					# otherwise pick up one coin from the slot for dragging
-					src = slots[clicked_slot]
-					drag_level = src.coin
-					src.count -= 1
-					if src.count <= 0:
-						src.coin = 0
+					drag_level = dispatch(TakeCoin(sim_now, clicked_slot))
 					drag_surf = get_coin_surface(drag_level)
 					drag_src = clicked_slot
 					dragging = True
 					drag_pos = event.pos
 					continue
 				# UI handling
-				if btn_deal["rect"].collidepoint((mx, my)) and not worker_enabled:
-					now_click = pygame.time.get_ticks() / 1000.0
-					# use effective cooldown (reduced by Time Thief purchases)
-					eff_cd = effective_deal_cooldown()
-					if now_click - last_deal_time >= eff_cd:
-						# deal one coin per unlocked slot
-						for _ in range(unlocked_slots):
-							# spawn up to max_deal_level (respect cap)
-							lvl = weighted_random_coin(slots, cap=min(max_deal_level, unlocked_slots + 2))
-							add_coin_to_slots(slots, lvl)
-						# process combines but do NOT grant currency for deal-triggered combines
-						_ , _ = process_combines(slots, currency, prestige_mult)
-						last_gain = 0
-						last_deal_time = now_click
-					else:
-						# still cooling down; ignore click
-						pass
-				elif worker_owned and btn_worker_toggle["rect"].collidepoint((mx, my)):
-					worker_enabled = not worker_enabled
-					if worker_enabled:
-						worker_last_deal_time = pygame.time.get_ticks() / 1000.0
+				if btn_deal["rect"].collidepoint((mx, my)) and not state.worker_enabled:
+					# deal one coin per unlocked slot (ignored while cooling down)
+					dispatch(Deal(sim_now))
+				elif state.worker_owned and btn_worker_toggle["rect"].collidepoint((mx, my)):
+					dispatch(ToggleWorker(sim_now))
 					continue
 				elif btn_upgrades["rect"].collidepoint((mx, my)):
 					# open upgrades popup (contains Buy Slot and future upgrades)
@@ -1207,9 +1335,10 @@ def main():
 						screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
 					else:
 						screen = pygame.display.set_mode((WIDTH, HEIGHT))
+					tracker.invalidate()
 				elif btn_prestige["rect"].collidepoint((mx, my)):
 					# open a confirmation modal instead of immediate prestige
-					if unlocked_slots > INITIAL_SLOTS or currency >= 1000:
+					if state.can_prestige():
 						pw, ph = 520, 160
 						mx0 = (WIDTH - pw) // 2
 						my0 = (HEIGHT - ph) // 2
@@ -1228,32 +1357,12 @@ def main():
 						help_popup = {"rect": pygame.Rect(mx0, my0, pw, ph), "close": close_rect, "scroll": 0}
 				# Save/load handlers (separate from prestige)
 				elif btn_save["rect"].collidepoint((mx, my)):
-					save_path = os.path.join(os.path.dirname(__file__), "save.json")
-					saved = save_game(save_path, slots, unlocked_slots, currency, prestige_level, worker_owned, worker_enabled, time_thief_count, worker_upgraded)
-					# no blocking UI; last_gain used to show feedback
-					last_gain = 0 if saved else -1
+					# written in the background; last_gain shows the result when it is done
+					saver.submit(profile, take_snapshot())
+					save_feedback = True
 				elif btn_load["rect"].collidepoint((mx, my)):
-					save_path = os.path.join(os.path.dirname(__file__), "save.json")
-					data = load_game(save_path)
-					if data:
-						# clamp loaded unlocked_slots to MAX_SLOTS
-						loaded_slots = int(data.get("unlocked_slots", INITIAL_SLOTS))
-						loaded_slots = max(INITIAL_SLOTS, min(MAX_SLOTS, loaded_slots))
-						slots = [Slot() for _ in range(loaded_slots)]
-						for i, sdata in enumerate(data.get("slots", [])):
-							if i < len(slots):
-								slots[i].coin = sdata.get("coin", 0)
-								slots[i].count = sdata.get("count", 0)
-						unlocked_slots = loaded_slots
-						currency = data.get("currency", 0)
-						prestige_level = data.get("prestige_level", 0)
-						prestige_mult = 1.0 + prestige_level * 0.1
-						# restore worker state if present
-						worker_owned = data.get("worker_owned", False)
-						worker_enabled = data.get("worker_enabled", False)
-						worker_upgraded = data.get("worker_upgraded", False)
-						# restore Time Thief purchases if present
-						time_thief_count = data.get("time_thief_count", 0)
+					# reload the running profile's last save
+					loader = load_saved_game(profile)
 				# Buy coin menu handling and sell-popup handling
 				else:
 					# Buy menu toggle
@@ -1279,13 +1388,7 @@ def main():
 						if buy_popup["rect"].collidepoint((mx, my)):
 							for opt in buy_popup["options"]:
 								if opt["rect"].collidepoint((mx, my)):
-									lvl = opt["level"]
-									cost = opt["cost"]
-									if currency >= cost and lvl <= highest_purchasable:
-										currency -= cost
-										add_coin_to_slots(slots, lvl)
-										currency, last_gain = process_combines(slots, currency, prestige_mult)
-										update_market_prices()
+									dispatch(BuyCoin(sim_now, opt["level"]))
 						# if click was outside the popup, close it
 						else:
 							buy_popup = None
@@ -1297,31 +1400,15 @@ def main():
 								if opt["rect"].collidepoint((mx, my)):
 									action = opt.get("action")
 									if action == "buy_slot":
-										cost = opt.get("cost", 0)
-										if currency >= cost and unlocked_slots < MAX_SLOTS:
-											currency -= cost
-											slots.append(Slot())
-											unlocked_slots += 1
-											update_market_prices()
+										if dispatch(BuySlot(sim_now)):
+											dispatch(UpdatePrices(sim_now))
 									elif action == "buy_worker":
-										cost = opt.get("cost", 0)
-										if currency >= cost and not worker_owned:
-											currency -= cost
-											worker_owned = True
-											# enable worker immediately for convenience
-											worker_enabled = True
-											worker_last_deal_time = pygame.time.get_ticks() / 1000.0
+										dispatch(BuyWorker(sim_now))
 									elif action == "buy_worker_upgrade":
-										cost = opt.get("cost", 0)
 										# can only buy the worker upgrade if player owns the worker and has maxed Time Thiefs
-										if currency >= cost and worker_owned and not worker_upgraded and time_thief_count >= max_time_thief_count():
-											currency -= cost
-											worker_upgraded = True
+										dispatch(BuyWorkerUpgrade(sim_now))
 									elif action == "buy_time_thief":
-										cost = opt.get("cost", 0)
-										if currency >= cost and time_thief_count < max_time_thief_count():
-											currency -= cost
-											time_thief_count += 1
+										dispatch(BuyTimeThief(sim_now))
 									else:
 										pass
 									break
@@ -1331,82 +1418,23 @@ def main():
 					# handle sell popup clicks if present
 					if sell_popup:
 						lvl = sell_popup["level"]
+						slot_idx = sell_popup.get("slot")
+						now_sell = sim_now
 						# sell 1
 						if sell_popup["sell1"].collidepoint((mx, my)):
-							price = current_prices.get(lvl, coin_value(lvl))
-							sold = 0
-							slot_idx = sell_popup.get("slot")
-							if slot_idx is not None and slot_idx < len(slots):
-								s = slots[slot_idx]
-								if s.coin == lvl and s.count > 0:
-									s.count -= 1
-									if s.count == 0:
-										s.coin = 0
-									currency += price
-									# record sale with amplified impact
-									for _ in range(SELL_IMPACT_MULTIPLIER):
-										market_sales_history[lvl].append(price)
-									_market_now = pygame.time.get_ticks() / 1000.0
-									for _ in range(SELL_IMPACT_MULTIPLIER):
-										market_sales_timestamps[lvl].append(_market_now)
-									sold = 1
-								else:
-									sold = 0
-							else:
-								sold = 0
-							if sold:
-								update_market_prices()
+							dispatch(Sell(now_sell, slot_idx, 1, lvl))
 							# keep popup open only if the original slot still has coins of this level
-							if not (slot_idx is not None and slot_idx < len(slots) and slots[slot_idx].coin == lvl and slots[slot_idx].count > 0):
+							if not (slot_idx is not None and slot_idx < len(state.slots) and state.slots[slot_idx].coin == lvl and state.slots[slot_idx].count > 0):
 								sell_popup = None
 						# sell 5
 						elif sell_popup["sell5"].collidepoint((mx, my)):
-							price = current_prices.get(lvl, coin_value(lvl))
-							sold = 0
-							slot_idx = sell_popup.get("slot")
-							if slot_idx is not None and slot_idx < len(slots):
-								s = slots[slot_idx]
-								while s.coin == lvl and s.count > 0 and sold < 5:
-									s.count -= 1
-									currency += price
-									# append amplified entries for this sale
-									for _ in range(SELL_IMPACT_MULTIPLIER):
-										market_sales_history[lvl].append(price)
-									_market_now = pygame.time.get_ticks() / 1000.0
-									for _ in range(SELL_IMPACT_MULTIPLIER):
-										market_sales_timestamps[lvl].append(_market_now)
-									sold += 1
-								if s.count == 0:
-									s.coin = 0
-							else:
-								sold = 0
-							if sold:
-								update_market_prices()
+							dispatch(Sell(now_sell, slot_idx, 5, lvl))
 							# keep popup open only if original slot still has coins
-							if not (slot_idx is not None and slot_idx < len(slots) and slots[slot_idx].coin == lvl and slots[slot_idx].count > 0):
+							if not (slot_idx is not None and slot_idx < len(state.slots) and state.slots[slot_idx].coin == lvl and state.slots[slot_idx].count > 0):
 								sell_popup = None
 						# sell all (target the selected slot only)
 						elif sell_popup["sell_all"].collidepoint((mx, my)):
-							price = current_prices.get(lvl, coin_value(lvl))
-							total_sold = 0
-							slot_idx = sell_popup.get("slot")
-							if slot_idx is not None and slot_idx < len(slots):
-								s = slots[slot_idx]
-								if s.coin == lvl and s.count > 0:
-									n = s.count
-									currency += price * n
-									# append amplified entries per coin sold
-									for _ in range(n):
-										for _ in range(SELL_IMPACT_MULTIPLIER):
-											market_sales_history[lvl].append(price)
-										_market_now = pygame.time.get_ticks() / 1000.0
-										for _ in range(SELL_IMPACT_MULTIPLIER):
-											market_sales_timestamps[lvl].append(_market_now)
-									total_sold += n
-									s.count = 0
-									s.coin = 0
-							if total_sold:
-								update_market_prices()
+							dispatch(Sell(now_sell, slot_idx, None, lvl))
 							sell_popup = None
 			elif event.type == pygame.MOUSEMOTION:
 				if dragging:
@@ -1414,53 +1442,11 @@ def main():
 			elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
 				if dragging:
 					mx, my = event.pos
-					target = None
-					for i in range(len(slots)):
-						rect = slot_rect(i)
-						if rect.collidepoint((mx, my)) and i < unlocked_slots:
-							target = i
-							break
-					# drop logic
-					if target is None:
-						# return to source
-						if drag_src is not None and drag_src < len(slots):
-							slots[drag_src].coin = drag_level if slots[drag_src].coin == 0 else slots[drag_src].coin
-							slots[drag_src].count += 1
-						else:
-							# try to find an empty slot
-							placed = False
-							for s in slots:
-								if s.is_empty():
-									s.coin = drag_level
-									s.count = 1
-									placed = True
-									break
-							if not placed:
-								# discard (shouldn't happen)
-								pass
-					else:
-						# place into target
-						t = slots[target]
-						if t.is_empty():
-							t.coin = drag_level
-							t.count = 1
-						elif t.coin == drag_level:
-							# same kind: add one, then process combines
-							if t.count < SLOT_CAPACITY:
-								t.count += 1
-							else:
-								t.count += 1
-							currency, last_gain = process_combines(slots, currency, prestige_mult)
-						else:
-							# different kind: return to source
-							if drag_src is not None and drag_src < len(slots):
-								slots[drag_src].count += 1
-							else:
-								for s in slots:
-									if s.is_empty():
-										s.coin = drag_level
-										s.count = 1
-										break
+					target = slot_layout().cell_at((mx, my))
+					if target is not None and target >= state.unlocked_slots:
+						target = None
+					# drop logic: place into target, merge same kind, else return to source
+					dispatch(DropCoin(sim_now, drag_level, target, drag_src))
 					# clear dragging state
 					dragging = False
 					drag_level = None
@@ -1469,28 +1455,148 @@ def main():
 					drag_pos = (0, 0)
 
 
-		# worker auto-deal: executes the same spawn/combine logic as the Deal button
-		now_worker = pygame.time.get_ticks() / 1000.0
-		if worker_owned and worker_enabled and not help_popup:
-			# worker uses the effective cooldown (Time Thief reduces both manual and worker speeds)
-			worker_multiplier = 1.0 if worker_upgraded else 2.0
-			worker_interval = effective_deal_cooldown() * worker_multiplier
-			if now_worker - worker_last_deal_time >= worker_interval:
-				for _ in range(unlocked_slots):
-						lvl = weighted_random_coin(slots, cap=min(max_deal_level, unlocked_slots + 2))
-						add_coin_to_slots(slots, lvl)
-						# worker deals should not directly award currency either
-						_ , _ = process_combines(slots, currency, prestige_mult)
-						last_gain = 0
-				worker_last_deal_time = now_worker
-				update_market_prices()
+		profiler.mark("events")
+
+		# work out what every widget shows this frame
+		now_draw = sim_now
+		# pick up what the events changed (the same object when nothing did)
+		derived = state.derived()
+		highest_purchasable = derived.highest_purchasable
+		slot_cost = derived.slot_cost
+		no_moves = derived.no_moves
+		# if upgrades popup open, refresh displayed costs
+		if upgrades_popup:
+			for opt in upgrades_popup["options"]:
+				if opt.get("action") == "buy_slot":
+					opt["cost"] = slot_cost
+		# prepare buy popup options if open
+		if buy_popup:
+			for opt in buy_popup["options"]:
+				lvl = opt["level"]
+				opt["cost"] = coin_value(lvl)
+		# Deal button: countdown label while cooling down, ready border when a manual deal is available
+		deal_label = btn_deal["label"]
+		deal_disabled = False
+		deal_ready = False
+		# the countdown is the only thing on screen that changes by itself (every tenth of a second)
+		redraw_at = None
+		if state.worker_enabled:
+			# worker countdown (worker uses double the manual cooldown unless upgraded)
+			remaining_worker = max(0.0, state.worker_interval() - (now_draw - state.worker_last_deal_time))
+			deal_label = f"{remaining_worker:.1f}s"
+			deal_disabled = True
+			if remaining_worker > 0.0:
+				redraw_at = now_draw + max(remaining_worker % 0.1, 1.0 / SIM_HZ)
+		else:
+			remaining_manual = max(0.0, state.effective_deal_cooldown() - (now_draw - state.last_deal_time))
+			if remaining_manual > 0.0:
+				deal_label = f"{remaining_manual:.1f}s"
+				redraw_at = now_draw + max(remaining_manual % 0.1, 1.0 / SIM_HZ)
+			else:
+				deal_ready = True
+		btn_worker_toggle["label"] = "Worker:On" if state.worker_enabled else "Worker:Off"
+		buttons = [
+			(btn_deal, deal_disabled, deal_label),
+			(btn_upgrades, state.currency < slot_cost, None),
+			(btn_prestige, not state.can_prestige(), None),
+			(btn_save, False, None),
+			(btn_load, False, None),
+			(btn_fullscreen, False, None),
+			(btn_help, False, None),
+			(btn_buy_menu, False, None),
+		]
+		if state.worker_owned:
+			buttons.append((btn_worker_toggle, False, None))
+		chart_rect = pygame.Rect(WIDTH - 480 - 20, 540, 480, 160)
+		# HUD - stacked to avoid overlap
+		hud_x = 50
+		hud_y = 528
+		# determine line height safely via rendering a sample glyph (works with bitmap fallback)
+		sample_surf = render_text(small_font or font, "A")
+		line_h = sample_surf.get_height() + 6
+		hud_texts = [
+			f"Currency: {state.currency}",
+			f"Prestige Lv: {state.prestige_level}  Mult: x{state.prestige_mult:.2f}",
+			f"Unlocked Slots: {state.unlocked_slots}",
+			f"Last Gain: {state.last_gain}",
+		]
+		hud_items = []
+		for i, t in enumerate(hud_texts):
+			surf = render_text(small_font or font, t, (220, 220, 200))
+			hud_items.append((surf, (hud_x + (i // 2) * 320, hud_y + (i % 2) * line_h)))
+		# show indicator if low-level coins (1-3) cannot be placed anywhere
+		can_place_low = any(state.can_place_level(l) for l in range(1, 4))
+		warn_surf = None
+		if not can_place_low:
+			warn = "Low-level deals blocked — sell coins or buy slots to allow them."
+			warn_surf = render_text_wrapped(small_font or font, warn, (240,140,40), 420)
+		warn_pos = (hud_x, hud_y + 2 * line_h + 6)
+		# notice above the board (e.g. the worker's offline catch-up), until it times out
+		notice_surf = None
+		if notice is not None and now_draw >= notice["until"]:
+			notice = None
+		if notice is not None:
+			notice_surf = render_text(small_font or font, notice["text"], (240, 220, 140))
+			notice_pos = ((WIDTH - notice_surf.get_width()) // 2, 16)
+
+		# report widgets to the tracker; only the areas that changed get repainted
+		tracker.begin()
+		slot_rects = slot_layout().rects
+		for i, s in enumerate(state.slots):
+			tracker.track(("slot", i), slot_rects[i], (s.coin, s.count, i < state.unlocked_slots))
+		tracker.track("chart", chart_rect, state.price_version)
+		for i, (b, disabled, label) in enumerate(buttons):
+			tracker.track(("button", i), b["rect"], (label or b["label"], disabled, b is btn_deal and deal_ready))
+		hud_rect = pygame.Rect(hud_items[0][1], hud_items[0][0].get_size())
+		tracker.track("hud", hud_rect.unionall([pygame.Rect(p, s.get_size()) for s, p in hud_items]), tuple(hud_texts))
+		if warn_surf:
+			tracker.track("warning", pygame.Rect(warn_pos, warn_surf.get_size()))
+		if notice_surf:
+			tracker.track("notice", pygame.Rect(notice_pos, notice_surf.get_size()), notice["text"])
+		if no_moves:
+			tracker.track("no_moves", screen.get_rect(), state.unlocked_slots >= MAX_SLOTS)
+		if sell_popup:
+			lvl = sell_popup["level"]
+			tracker.track("sell_popup", sell_popup["rect"], (lvl, state.current_prices.get(lvl, coin_value(lvl))))
+		if buy_popup:
+			r = buy_popup["rect"].unionall([o["rect"] for o in buy_popup["options"]])
+			tracker.track("buy_popup", r, (state.currency, highest_purchasable))
+		if upgrades_popup:
+			tracker.track("upgrades_popup", upgrades_popup["rect"].inflate(6, 6), (state.currency, slot_cost, state.unlocked_slots, state.worker_owned, state.worker_upgraded, state.time_thief_count))
+		if prestige_popup:
+			tracker.track("prestige_popup", screen.get_rect())
+		if exit_menu_popup:
+			tracker.track("exit_menu_popup", screen.get_rect())
+		if help_popup:
+			tracker.track("help", screen.get_rect(), help_signature(help_popup))
+		if dragging and drag_surf:
+			drag_rect = drag_surf.get_rect(center=drag_pos)
+			tracker.track("drag", drag_rect)
+		if show_profiler:
+			prof_lines = profiler_lines()
+			prof_line_h = render_text(small_font or font, "A").get_height() + 2
+			prof_rect = pygame.Rect(WIDTH - 330, 8, 322, 12 + len(prof_lines) * prof_line_h)
+			tracker.track("profiler", prof_rect, tuple(prof_lines))
+		dirty = tracker.end()
+		# idle until the next timer, countdown tick or overlay refresh, unless input comes first
+		if not menu_active:
+			reschedule()
+			wake = [t for t in (timers.next_due(), redraw_at, notice and notice["until"]) if t is not None]
+			if show_profiler:
+				wake.append(now_draw + 0.25 - time.monotonic() % 0.25)
+			wake_at = min(wake, default=None)
+		profiler.mark("layout")
+		if not dirty:
+			continue
+		# redraw the whole scene clipped to the changed area (keeps overlapping widgets in z-order)
+		screen.set_clip(dirty[0].unionall(dirty[1:]))
 
 		screen.fill((30, 30, 40))
 
-		# draw slots (use slot_rect so layout/wrapping is consistent)
-		for i, s in enumerate(slots):
-			rect = slot_rect(i)
-			color = (70, 70, 90) if i < unlocked_slots else (40, 40, 50)
+		# draw slots (same layout table as the hit-testing)
+		for i, s in enumerate(state.slots):
+			rect = slot_rects[i]
+			color = (70, 70, 90) if i < state.unlocked_slots else (40, 40, 50)
 			pygame.draw.rect(screen, color, rect, border_radius=8)
 			pygame.draw.rect(screen, (120, 120, 140), rect, 2, border_radius=8)
 			if not s.is_empty():
@@ -1506,126 +1612,41 @@ def main():
 				screen.blit(label, (rect.x + 10, rect.y + 10))
 
 		# draw UI area
-		def draw_btn(b, disabled=False):
+		def draw_btn(b, disabled=False, label=None):
 			bg = (80, 80, 100) if disabled else (50, 100, 160)
 			pygame.draw.rect(screen, bg, b["rect"], border_radius=6)
 			pygame.draw.rect(screen, (200, 200, 220), b["rect"], 2, border_radius=6)
 			lbl_font = small_font or font
-			lbl = render_text(lbl_font, b["label"], (200, 200, 200) if disabled else (255, 255, 255))
+			lbl = render_text(lbl_font, label or b["label"], (200, 200, 200) if disabled else (255, 255, 255))
 			# center label in button
 			x = b["rect"].x + (b["rect"].width - lbl.get_width()) // 2
 			y = b["rect"].y + (b["rect"].height - lbl.get_height()) // 2
 			screen.blit(lbl, (x, y))
 
+		profiler.mark("slots")
+
 		# draw bottom UI panel
 		pygame.draw.rect(screen, (20, 20, 30), (0, 520, WIDTH, HEIGHT - 520))
-		# update dynamic labels for buy slot
-		slot_cost = 200 * (2 ** (unlocked_slots - INITIAL_SLOTS))
-		# if upgrades popup open, refresh displayed costs
-		if upgrades_popup:
-			for opt in upgrades_popup["options"]:
-				if opt.get("action") == "buy_slot":
-					opt["cost"] = slot_cost
-		# prepare buy popup options if open
-		if buy_popup:
-			for opt in buy_popup["options"]:
-				lvl = opt["level"]
-				opt["cost"] = coin_value(lvl)
 
 		# draw small market chart at bottom-right inside the UI panel (draw first so UI overlays it)
-		chart_w = 480
-		chart_h = 160
-		chart_x = WIDTH - chart_w - 20
-		chart_y = 540
-		pygame.draw.rect(screen, (18, 18, 24), (chart_x, chart_y, chart_w, chart_h))
-		pygame.draw.rect(screen, (90,90,100), (chart_x, chart_y, chart_w, chart_h), 1)
-		# gather levels to plot (up to 6)
-		plot_levels = sorted(price_history.keys())[-6:]
-		colors = [(220,180,60),(180,220,100),(160,160,240),(240,160,200),(200,200,200),(180,140,220)]
-		if plot_levels:
-			# find max price in history window
-			mxp = max(max(price_history[l]) if price_history[l] else 1 for l in plot_levels)
-			for i, lvl in enumerate(plot_levels):
-				hist = price_history.get(lvl, [])
-				if not hist:
-					continue
-				col = colors[i % len(colors)]
-				n = len(hist)
-				for j in range(1, n):
-					x1 = chart_x + int((j-1)/price_history_max * chart_w)
-					x2 = chart_x + int(j/price_history_max * chart_w)
-					y1 = chart_y + chart_h - int((hist[j-1]/mxp) * (chart_h-8)) - 4
-					y2 = chart_y + chart_h - int((hist[j]/mxp) * (chart_h-8)) - 4
-					pygame.draw.line(screen, col, (x1,y1), (x2,y2), 2)
-				# label
-				lbl = render_text(small_font or font, f"C{lvl}", col)
-				screen.blit(lbl, (chart_x + chart_w - 40, chart_y + 4 + i*14))
+		screen.blit(render_chart(chart_rect.size), chart_rect)
+		profiler.mark("chart")
 
 		# draw main buttons, with disabled state when unaffordable (after chart so buttons are visible)
-		# draw Deal button; if cooling down show countdown as the label
-		now_draw = pygame.time.get_ticks() / 1000.0
-		# manual remaining (use effective cooldown)
-		eff_cd = effective_deal_cooldown()
-		remaining_manual = max(0.0, eff_cd - (now_draw - last_deal_time))
-		# if worker is enabled, show worker countdown (worker uses double the manual cooldown)
-		if worker_enabled:
-			worker_multiplier = 1.0 if worker_upgraded else 2.0
-			worker_interval = eff_cd * worker_multiplier
-			remaining_worker = max(0.0, worker_interval - (now_draw - worker_last_deal_time))
-			orig_label = btn_deal["label"]
-			btn_deal["label"] = f"{remaining_worker:.1f}s"
-			draw_btn(btn_deal, disabled=True)
-			btn_deal["label"] = orig_label
-		else:
-			deal_disabled = remaining_manual > 0.0
-			if remaining_manual > 0.0:
-				orig_label = btn_deal["label"]
-				btn_deal["label"] = f"{remaining_manual:.1f}s"
-				draw_btn(btn_deal, disabled=False)
-				btn_deal["label"] = orig_label
-			else:
-				draw_btn(btn_deal, disabled=deal_disabled)
-				# ready indicator: green border around the button when manual deal is available
-				if not deal_disabled:
-					pygame.draw.rect(screen, (60,200,80), btn_deal["rect"], 3, border_radius=6)
-		draw_btn(btn_upgrades, disabled=(currency < slot_cost))
-		draw_btn(btn_prestige, disabled=(currency < 1000 and unlocked_slots==INITIAL_SLOTS))
-		draw_btn(btn_save)
-		draw_btn(btn_load)
-		draw_btn(btn_fullscreen)
-		draw_btn(btn_help)
-		draw_btn(btn_buy_menu)
-		# draw worker toggle when purchased
-		if worker_owned:
-			btn_worker_toggle["label"] = "Worker:On" if worker_enabled else "Worker:Off"
-			draw_btn(btn_worker_toggle)
-
-
-
-		# HUD - stacked to avoid overlap
-		hud_x = 50
-		hud_y = 528
-		# determine line height safely via rendering a sample glyph (works with bitmap fallback)
-		sample_surf = render_text(small_font or font, "A")
-		line_h = sample_surf.get_height() + 6
-		hud_texts = [
-			f"Currency: {currency}",
-			f"Prestige Lv: {prestige_level}  Mult: x{prestige_mult:.2f}",
-			f"Unlocked Slots: {unlocked_slots}",
-			f"Last Gain: {last_gain}",
-		]
-		for i, t in enumerate(hud_texts):
-			surf = render_text(small_font or font, t, (220, 220, 200))
-			screen.blit(surf, (hud_x + (i // 2) * 320, hud_y + (i % 2) * line_h))
-
-		# show indicator if low-level coins (1-3) cannot be placed anywhere
-		can_place_low = any(can_place_level(l) for l in range(1, 4))
-		warn_h = 0
-		if not can_place_low:
-			warn = "Low-level deals blocked — sell coins or buy slots to allow them."
-			ws = render_text_wrapped(small_font or font, warn, (240,140,40), 420)
-			warn_h = ws.get_height()
-			screen.blit(ws, (hud_x, hud_y + 2 * line_h + 6))
+		# (Deal shows its cooldown countdown as the label)
+		for b, disabled, label in buttons:
+			draw_btn(b, disabled=disabled, label=label)
+		# ready indicator: green border around the button when manual deal is available
+		if deal_ready:
+			pygame.draw.rect(screen, (60,200,80), btn_deal["rect"], 3, border_radius=6)
+
+		# HUD
+		for surf, pos in hud_items:
+			screen.blit(surf, pos)
+		if warn_surf:
+			screen.blit(warn_surf, warn_pos)
+		if notice_surf:
+			screen.blit(notice_surf, notice_pos)
 
 		# (tooltip moved to Help menu)
 
@@ -1653,7 +1674,7 @@ def main():
 			# draw buttons
 			for r, lbl in ((buy_rect, "Buy Slot"), (sell_rect, "Sell Coin"), (restart_rect, "Restart")):
 				# special-case Buy Slot when we've hit the global slot cap
-				if lbl == "Buy Slot" and unlocked_slots >= MAX_SLOTS:
+				if lbl == "Buy Slot" and state.unlocked_slots >= MAX_SLOTS:
 					btn_bg = (48, 48, 64)
 					text_lbl = "Buy Slot (Maxed)"
 					text_col = (200, 200, 200)
@@ -1666,10 +1687,12 @@ def main():
 				lsurf = render_text(small_font or font, text_lbl, text_col)
 				screen.blit(lsurf, (r.x + (r.width - lsurf.get_width()) // 2, r.y + (r.height - lsurf.get_height()) // 2))
 
+		profiler.mark("ui")
+
 		# draw popups (sell / buy / upgrades) after HUD/modal so they fully overlay other UI
 		if sell_popup:
 			lvl = sell_popup["level"]
-			price = current_prices.get(lvl, coin_value(lvl))
+			price = state.current_prices.get(lvl, coin_value(lvl))
 			pygame.draw.rect(screen, (40, 40, 50), sell_popup["rect"], border_radius=6)
 			pygame.draw.rect(screen, (200,200,220), sell_popup["rect"], 2, border_radius=6)
 			t = render_text(small_font or font, f"Sell C{lvl}: {price}", (220,220,220))
@@ -1687,7 +1710,7 @@ def main():
 				r = opt["rect"]
 				lvl = opt["level"]
 				cost = opt.get("cost", coin_value(lvl))
-				disabled = (currency < cost) or (lvl > highest_purchasable)
+				disabled = (state.currency < cost) or (lvl > highest_purchasable)
 				bg = (64,64,74) if disabled else (70,120,180)
 				pygame.draw.rect(screen, bg, r, border_radius=4)
 				pygame.draw.rect(screen, (200,200,220), r, 1, border_radius=4)
@@ -1712,26 +1735,26 @@ def main():
 				action = opt.get("action")
 				cost = opt.get("cost", 0)
 				if action == "buy_slot":
-					if unlocked_slots >= MAX_SLOTS:
+					if state.unlocked_slots >= MAX_SLOTS:
 						lbl = "Buy Slot (Maxed)"
 						disabled = True
 					else:
 						lbl = f"Buy Slot ({cost})"
-						disabled = (currency < cost)
+						disabled = (state.currency < cost)
 				elif action == "buy_worker":
 					lbl = f"Worker ({cost})"
 					# disable if unaffordable or already owned
-					disabled = (currency < cost) or worker_owned
+					disabled = (state.currency < cost) or state.worker_owned
 				elif action == "buy_time_thief":
-					max_tt = max_time_thief_count()
-					lbl = f"Time Thief x{time_thief_count}/{max_tt} ({cost})"
+					max_tt = state.max_time_thief_count()
+					lbl = f"Time Thief x{state.time_thief_count}/{max_tt} ({cost})"
 					# disable if unaffordable or already at max
-					disabled = (currency < cost) or (time_thief_count >= max_tt)
+					disabled = (state.currency < cost) or (state.time_thief_count >= max_tt)
 				elif action == "buy_worker_upgrade":
 					# only show the upgrade when it's relevant; display counts & disable otherwise
 					lbl = f"Worker Upgrade ({cost})"
 					# disabled if unaffordable, worker not owned, already upgraded, or Time Thiefs not maxed
-					disabled = (currency < cost) or (not worker_owned) or worker_upgraded or (time_thief_count < max_time_thief_count())
+					disabled = (state.currency < cost) or (not state.worker_owned) or state.worker_upgraded or (state.time_thief_count < state.max_time_thief_count())
 				else:
 					lbl = "More..."
 					disabled = False
@@ -1800,47 +1823,168 @@ def main():
 		if help_popup:
 			render_help_popup(help_popup)
 
-		pygame.display.flip()
-
 		# draw dragged coin on top
 		if dragging and drag_surf:
-			x, y = drag_pos
-			screen.blit(drag_surf, (x - drag_surf.get_width() // 2, y - drag_surf.get_height() // 2))
-			pygame.display.flip()
-
+			screen.blit(drag_surf, drag_rect)
+		profiler.mark("popups")
+
+		if show_profiler:
+			over = pygame.Surface(prof_rect.size, pygame.SRCALPHA)
+			over.fill((0, 0, 0, 190))
+			screen.blit(over, prof_rect)
+			for i, line in enumerate(prof_lines):
+				screen.blit(render_text(small_font or font, line, (180, 230, 180)), (prof_rect.x + 8, prof_rect.y + 6 + i * prof_line_h))
+			profiler.mark("overlay")
+
+		screen.set_clip(None)
+		pygame.display.update(dirty)
+		profiler.mark("present")
+
+	# keep the progress of a running game, and let pending writes finish
+	if not menu_active:
+		saver.submit(profile, take_snapshot())
+	if saver.poll() is None:
+		# the only wait for a write: say so while it finishes
+		pygame.display.update(draw_message_box(["Saving..."]))
+	saver.close()
+	if recorder is not None:
+		recorder.close()
+	profiler.stop_trace()
 	pygame.quit()
 	sys.exit()
 
 
-def save_game(path, slots, unlocked_slots, currency, prestige_level, worker_owned=False, worker_enabled=False, time_thief_count=0, worker_upgraded=False):
-	try:
-		data = {
-			"slots": [{"coin": s.coin, "count": s.count} for s in slots],
-			"unlocked_slots": unlocked_slots,
-			"currency": currency,
-			"prestige_level": prestige_level,
-			"worker_owned": bool(worker_owned),
-			"worker_enabled": bool(worker_enabled),
-			"time_thief_count": int(time_thief_count),
-			"worker_upgraded": bool(worker_upgraded),
-		}
-		with open(path, "w") as f:
-			json.dump(data, f)
+class AutoSaver:
+	"""Writes save snapshots into a savefile.SaveStore on a background thread.
+
+	The UI thread only takes the snapshot (savefile.snapshot); encoding,
+	compression and writing happen here, so saving never stalls a frame.
+	Only the newest pending snapshot per save name is written, and explicit
+	saves go through the same thread so an older autosave can't land after them.
+	Nothing on the UI thread waits for a write except close() on exit.
+	"""
+
+	def __init__(self, store):
+		self.store = store
+		# save name -> (snapshot, kind), written in submission order
+		self.pending = {}
+		self.busy = False
+		self.closed = False
+		self.last_ok = True
+		self.cond = threading.Condition()
+		self.thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+		self.thread.start()
+
+	def submit(self, name, data, kind=savefile.KIND_PROFILE):
+		# queue a snapshot, replacing any not yet written under the same name
+		with self.cond:
+			self.pending.pop(name, None)
+			self.pending[name] = (data, kind)
+			self.cond.notify_all()
+
+	def poll(self):
+		# None while writes are pending, else whether the last one succeeded (never blocks)
+		with self.cond:
+			if self.pending or self.busy:
+				return None
+			return self.last_ok
+
+	def flush(self):
+		# wait for pending writes; returns whether the last one succeeded
+		with self.cond:
+			while self.pending or self.busy:
+				self.cond.wait()
+			return self.last_ok
+
+	def close(self):
+		# write whatever is pending, then stop the thread
+		with self.cond:
+			self.closed = True
+			self.cond.notify_all()
+		self.thread.join()
+
+	def _run(self):
+		while True:
+			with self.cond:
+				while not self.pending and not self.closed:
+					self.cond.wait()
+				if not self.pending:
+					return
+				batch = self.pending
+				self.pending = {}
+				self.busy = True
+			ok = True
+			for name, (data, kind) in batch.items():
+				try:
+					self.store.write(name, data, kind)
+				except Exception:
+					print(f"Autosave of {name} failed:")
+					traceback.print_exc()
+					ok = False
+			with self.cond:
+				self.busy = False
+				self.last_ok = ok
+				self.cond.notify_all()
+			pygame.event.post(pygame.event.Event(SAVED_EVENT))
+
+
+class SaveLoader:
+	"""Loads one save on a background thread, so the worker's offline catch-up never freezes the window.
+
+	The thread first waits for the AutoSaver's pending writes. The save goes
+	into a spare GameState (drawing from a copy of the live state's random
+	streams). When done() is true, finish() copies it into
+	the live state. The thread posts LOADED_EVENT when it is done, which
+	wakes the idle main loop.
+	"""
+
+	def __init__(self, saver, name, state, now, catch_up=True):
+		self.saver = saver
+		self.name = name
+		self.now = now
+		# whether the worker catches up on the time since the save
+		self.catch_up = catch_up
+		self.state = GameState()
+		self.state.rng.setstate(state.rng.getstate())
+		self.ok = None
+		self.thread = threading.Thread(target=self._run, name="load", daemon=True)
+		self.thread.start()
+
+	def done(self):
+		return self.ok is not None
+
+	def finish(self, state, now):
+		# move the loaded game into `state` (times shifted onto `now`); False if the load failed
+		if not self.ok:
+			return False
+		savefile.restore(state, savefile.snapshot(self.state, self.now, time.time()), now)
+		state.rng.setstate(self.state.rng.getstate())
+		state.last_catchup = self.state.last_catchup
 		return True
-	except Exception:
-		return False
+
+	def _run(self):
+		ok = False
+		try:
+			# let pending writes (e.g. Save & Exit's) land first
+			self.saver.flush()
+			ok = self.saver.store.load(self.name, self.state, self.now, wall_time=time.time() if self.catch_up else None)
+		except Exception:
+			print(f"Loading {self.name} failed:")
+			traceback.print_exc()
+		self.ok = ok
+		pygame.event.post(pygame.event.Event(LOADED_EVENT))
 
 
-def load_game(path):
-	try:
-		if not os.path.exists(path):
-			return None
-		with open(path, "r") as f:
-			data = json.load(f)
-		return data
-	except Exception:
-		return None
+def _arg(name):
+	# value following `name` on the command line, or None
+	if name in sys.argv[1:-1]:
+		return sys.argv[sys.argv.index(name) + 1]
+	return None
 
 
 if __name__ == "__main__":
-	main()
\ No newline at end of file
+	# --record PATH: log every action of the session (replay it with `python actionlog.py PATH`)
+	# --seed N: seed the deal and market random streams (reproducible sessions)
+	# --trace PATH: write per-frame phase timings to a CSV file (F4 toggles this in game)
+	# --fps N: render at most N frames per second (game logic keeps its own fixed step)
+	main(_arg("--record"), _arg("--seed"), _arg("--trace"), int(_arg("--fps") or RENDER_FPS))
\ No newline at end of file
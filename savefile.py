@@ -0,0 +1,512 @@
+"""Versioned save files for Combine Them!
+
+A save is a short header (magic, format version, flags) followed by the
+game state packed with varints and raw float/int arrays, optionally
+zlib-compressed. It holds the full state, including the market sales,
+the chart history and the cooldown timers. Game-clock times are stored
+along with the clock reading at the moment of saving, and shifted onto the
+new session's clock on load (the clock restarts every session).
+
+Saving is split into snapshot() (copies what's needed out of a GameState,
+cheap, run on the UI thread) and encode()/write() (can run on another
+thread). The plain JSON saves of earlier versions are still loaded.
+SaveStore keeps many named saves side by side with a small preview index.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+
+from engine import GameState, Slot, MarketLevel, PriceHistory, INITIAL_SLOTS, MAX_SLOTS
+
+
+MAGIC = b"CMSV"
+VERSION = 1
+# header flags
+FLAG_ZLIB = 1
+
+_HEADER = struct.Struct("<4sHB")
+_F64 = struct.Struct("<d")
+
+
+class SaveError(ValueError):
+	pass
+
+
+# --- encoding helpers ---
+
+def _put_uint(out, n):
+	while n >= 0x80:
+		out.append((n & 0x7F) | 0x80)
+		n >>= 7
+	out.append(n)
+
+
+def _put_int(out, n):
+	# zigzag, so small negative numbers stay small
+	_put_uint(out, n * 2 if n >= 0 else -n * 2 - 1)
+
+
+def _put_f64(out, x):
+	out += _F64.pack(x)
+
+
+def _put_array(out, arr):
+	# raw little-endian array contents, prefixed by the item count
+	_put_uint(out, len(arr))
+	if sys.byteorder == "big":
+		arr = array(arr.typecode, arr)
+		arr.byteswap()
+	out += arr.tobytes()
+
+
+class _Reader:
+	def __init__(self, data):
+		self.data = data
+		self.pos = 0
+
+	def uint(self):
+		n = 0
+		shift = 0
+		data = self.data
+		while True:
+			if self.pos >= len(data):
+				raise SaveError("truncated save")
+			b = data[self.pos]
+			self.pos += 1
+			n |= (b & 0x7F) << shift
+			if b < 0x80:
+				return n
+			shift += 7
+
+	def int(self):
+		n = self.uint()
+		return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+	def f64(self):
+		if self.pos + 8 > len(self.data):
+			raise SaveError("truncated save")
+		x = _F64.unpack_from(self.data, self.pos)[0]
+		self.pos += 8
+		return x
+
+	def array(self, typecode):
+		arr = array(typecode)
+		n = self.uint()
+		end = self.pos + n * arr.itemsize
+		if end > len(self.data):
+			raise SaveError("truncated save")
+		arr.frombytes(self.data[self.pos:end])
+		if sys.byteorder == "big":
+			arr.byteswap()
+		self.pos = end
+		return arr
+
+
+# --- snapshot / restore ---
+
+def snapshot(state, now, wall_time):
+	"""Copy everything a save needs out of `state`.
+
+	`now` is the game clock (for timer and market ages), `wall_time` the
+	seconds since the epoch (for the worker's offline catch-up on load).
+	"""
+	market = {lvl: m.columns() for lvl, m in state.market_sales.items()}
+	history = {lvl: (array("d", hist.view()), hist.last_time) for lvl, hist in state.price_history.items()}
+	return {
+		"wall_time": wall_time,
+		"clock": now,
+		"slots": [(s.coin, s.count) for s in state.slots],
+		"unlocked_slots": state.unlocked_slots,
+		"currency": state.currency,
+		"prestige_level": state.prestige_level,
+		"worker_owned": bool(state.worker_owned),
+		"worker_enabled": bool(state.worker_enabled),
+		"worker_upgraded": bool(state.worker_upgraded),
+		"time_thief_count": state.time_thief_count,
+		"deal_cooldown": state.deal_cooldown,
+		"last_deal_time": state.last_deal_time,
+		"worker_last_deal_time": state.worker_last_deal_time,
+		"last_price_update": state.last_price_update,
+		"current_prices": dict(state.current_prices),
+		"market": market,
+		"price_history": history,
+	}
+
+
+def restore(state, snap, now, wall_time=None):
+	"""Load a snapshot into `state`, then let the worker catch up on the time the game was closed."""
+	offline = 0.0
+	if wall_time is not None:
+		offline = max(0.0, wall_time - snap["wall_time"])
+	unlocked = max(INITIAL_SLOTS, min(MAX_SLOTS, snap["unlocked_slots"]))
+	state.slots = [Slot() for _ in range(unlocked)]
+	for s, (coin, count) in zip(state.slots, snap["slots"]):
+		s.coin = coin
+		s.count = count
+	state.unlocked_slots = unlocked
+	state.currency = snap["currency"]
+	state.prestige_level = snap["prestige_level"]
+	state.prestige_mult = 1.0 + state.prestige_level * 0.1
+	state.worker_owned = snap["worker_owned"]
+	state.worker_enabled = snap["worker_enabled"]
+	state.worker_upgraded = snap["worker_upgraded"]
+	state.time_thief_count = snap["time_thief_count"]
+	state.deal_cooldown = snap["deal_cooldown"]
+	# move saved times onto this session's clock, aged by the time spent offline
+	shift = now - snap["clock"] - offline
+	state.last_deal_time = snap["last_deal_time"] + shift
+	state.worker_last_deal_time = snap["worker_last_deal_time"] + shift
+	state.last_price_update = snap["last_price_update"] + shift
+	state.current_prices = dict(snap["current_prices"])
+	state.market_sales = {}
+	for lvl, (prices, times, weights) in snap["market"].items():
+		times = array("d", map(shift.__add__, times))
+		state.market_sales[lvl] = MarketLevel.from_columns(prices, times, weights, now)
+	state.price_history = {}
+	for lvl, (samples, last_time) in snap["price_history"].items():
+		state.price_history[lvl] = PriceHistory.from_samples(state.price_history_max, samples, last_time + shift)
+	state.price_version += 1
+	state.fast_forward_worker(offline)
+	return state
+
+
+# --- binary format ---
+
+def encode(snap, compress=True):
+	out = bytearray()
+	_put_f64(out, snap["wall_time"])
+	_put_f64(out, snap["clock"])
+	_put_uint(out, snap["unlocked_slots"])
+	_put_uint(out, len(snap["slots"]))
+	for coin, count in snap["slots"]:
+		_put_uint(out, coin)
+		_put_uint(out, count)
+	_put_int(out, snap["currency"])
+	_put_uint(out, snap["prestige_level"])
+	out.append(snap["worker_owned"] | snap["worker_enabled"] << 1 | snap["worker_upgraded"] << 2)
+	_put_uint(out, snap["time_thief_count"])
+	_put_f64(out, snap["deal_cooldown"])
+	_put_f64(out, snap["last_deal_time"])
+	_put_f64(out, snap["worker_last_deal_time"])
+	_put_f64(out, snap["last_price_update"])
+	_put_uint(out, len(snap["current_prices"]))
+	for lvl, price in snap["current_prices"].items():
+		_put_uint(out, lvl)
+		_put_int(out, price)
+	_put_uint(out, len(snap["market"]))
+	for lvl, (prices, times, weights) in snap["market"].items():
+		_put_uint(out, lvl)
+		_put_array(out, prices)
+		_put_array(out, times)
+		_put_array(out, weights)
+	_put_uint(out, len(snap["price_history"]))
+	for lvl, (samples, last_time) in snap["price_history"].items():
+		_put_uint(out, lvl)
+		_put_f64(out, last_time)
+		_put_array(out, samples)
+	flags = 0
+	payload = bytes(out)
+	if compress:
+		flags |= FLAG_ZLIB
+		payload = zlib.compress(payload)
+	return _HEADER.pack(MAGIC, VERSION, flags) + payload
+
+
+def _decode_v1(r):
+	snap = {"wall_time": r.f64(), "clock": r.f64(), "unlocked_slots": r.uint()}
+	snap["slots"] = [(r.uint(), r.uint()) for _ in range(r.uint())]
+	snap["currency"] = r.int()
+	snap["prestige_level"] = r.uint()
+	if r.pos >= len(r.data):
+		raise SaveError("truncated save")
+	bits = r.data[r.pos]
+	r.pos += 1
+	snap["worker_owned"] = bool(bits & 1)
+	snap["worker_enabled"] = bool(bits & 2)
+	snap["worker_upgraded"] = bool(bits & 4)
+	snap["time_thief_count"] = r.uint()
+	snap["deal_cooldown"] = r.f64()
+	snap["last_deal_time"] = r.f64()
+	snap["worker_last_deal_time"] = r.f64()
+	snap["last_price_update"] = r.f64()
+	snap["current_prices"] = {r.uint(): r.int() for _ in range(r.uint())}
+	market = {}
+	for _ in range(r.uint()):
+		lvl = r.uint()
+		market[lvl] = (r.array("d"), r.array("d"), r.array("q"))
+	snap["market"] = market
+	history = {}
+	for _ in range(r.uint()):
+		lvl = r.uint()
+		last_time = r.f64()
+		history[lvl] = (r.array("d"), last_time)
+	snap["price_history"] = history
+	return snap
+
+
+# format version -> payload decoder; add a new entry (and keep the old ones) when the layout changes
+_DECODERS = {1: _decode_v1}
+
+
+def decode(blob):
+	if len(blob) < _HEADER.size:
+		raise SaveError("not a save file")
+	magic, version, flags = _HEADER.unpack_from(blob)
+	if magic != MAGIC:
+		raise SaveError("not a save file")
+	decoder = _DECODERS.get(version)
+	if decoder is None:
+		raise SaveError(f"unsupported save version {version}")
+	payload = blob[_HEADER.size:]
+	if flags & FLAG_ZLIB:
+		try:
+			payload = zlib.decompress(payload)
+		except zlib.error as e:
+			raise SaveError(f"corrupt save: {e}")
+	return decoder(_Reader(payload))
+
+
+# --- files ---
+
+def write_file_atomic(path, blob):
+	# write a temp file next to `path`, then rename it over the old one:
+	# a crash mid-write leaves the previous save intact, never a truncated file
+	fd, tmp_path = tempfile.mkstemp(prefix=".save-", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+	try:
+		with os.fdopen(fd, "wb") as f:
+			f.write(blob)
+			f.flush()
+			os.fsync(f.fileno())
+		# mkstemp files are private; keep the permissions a plain open() would give
+		try:
+			mode = os.stat(path).st_mode & 0o777
+		except OSError:
+			mode = 0o644
+		os.chmod(tmp_path, mode)
+		os.replace(tmp_path, path)
+	except BaseException:
+		try:
+			os.unlink(tmp_path)
+		except OSError:
+			pass
+		raise
+
+
+def write(path, snap, compress=True):
+	write_file_atomic(path, encode(snap, compress=compress))
+
+
+def load(path, state, now, wall_time=None):
+	"""Load the save at `path` into `state`. Returns False if there is no usable save.
+
+	Reads both the binary format and the JSON saves of earlier versions.
+	"""
+	try:
+		with open(path, "rb") as f:
+			blob = f.read()
+	except OSError:
+		return False
+	if blob.startswith(MAGIC):
+		try:
+			snap = decode(blob)
+		except SaveError as e:
+			print(f"Could not load {path}: {e}")
+			return False
+		restore(state, snap, now, wall_time)
+		return True
+	# version 0: plain JSON (slots, currency and upgrades only)
+	try:
+		data = json.loads(blob)
+	except ValueError:
+		return False
+	if not isinstance(data, dict):
+		return False
+	state.load_save_data(data, wall_time=wall_time)
+	return True
+
+
+# --- multi-profile store ---
+
+INDEX_MAGIC = b"CMIX"
+INDEX_VERSION = 1
+# entry kinds
+KIND_PROFILE = 0
+KIND_CHECKPOINT = 1
+# longest save name, in bytes (fixed-size index records)
+MAX_NAME_LEN = 48
+
+_INDEX_HEADER = struct.Struct("<4sHHI")
+# name, kind, unlocked slots, top coin, prestige level, saved at (epoch), currency
+_INDEX_RECORD = struct.Struct(f"<{MAX_NAME_LEN}sBBHIdd")
+
+
+def _preview(name, kind, snap):
+	return {
+		"name": name,
+		"kind": kind,
+		"unlocked_slots": snap["unlocked_slots"],
+		"top_coin": max((coin for coin, _ in snap["slots"]), default=0),
+		"prestige_level": snap["prestige_level"],
+		"saved_at": snap["wall_time"],
+		"currency": snap["currency"],
+	}
+
+
+class SaveStore:
+	"""Named save profiles and checkpoints (e.g. one per prestige) in one directory.
+
+	Every entry is a `<name>.dat` save. index.bin keeps a fixed-size preview
+	record per entry (currency, prestige level, top coin, ...), read through
+	a memory map, so listing saves never decodes a save file. The index is
+	only a cache: if it is missing or damaged it is rebuilt from the saves.
+	"""
+
+	def __init__(self, root):
+		self.root = root
+		self.index_path = os.path.join(root, "index.bin")
+		self.lock = threading.Lock()
+
+	def path_for(self, name):
+		return os.path.join(self.root, name + ".dat")
+
+	@staticmethod
+	def valid_name(name):
+		return (
+			0 < len(name.encode("utf-8")) <= MAX_NAME_LEN
+			and not name.startswith(".")
+			and all(c.isalnum() or c in "-_@" for c in name)
+		)
+
+	def entries(self):
+		"""Preview dicts of all saves, most recently saved first."""
+		with self.lock:
+			entries = self._read_index()
+			if entries is None:
+				entries = self._rebuild_index()
+		entries = [e for e in entries if os.path.exists(self.path_for(e["name"]))]
+		entries.sort(key=lambda e: e["saved_at"], reverse=True)
+		return entries
+
+	def new_profile_name(self):
+		names = {e["name"] for e in self.entries()}
+		n = 1
+		while f"profile{n}" in names:
+			n += 1
+		return f"profile{n}"
+
+	def write(self, name, snap, kind=KIND_PROFILE, compress=True):
+		if not self.valid_name(name):
+			raise ValueError(f"invalid save name {name!r}")
+		os.makedirs(self.root, exist_ok=True)
+		write(self.path_for(name), snap, compress=compress)
+		with self.lock:
+			self._update_index(_preview(name, kind, snap))
+
+	def load(self, name, state, now, wall_time=None):
+		if not self.valid_name(name):
+			return False
+		return load(self.path_for(name), state, now, wall_time)
+
+	def import_file(self, name, path):
+		"""Copy a single-file save (binary or old JSON) into the store as a profile."""
+		state = GameState()
+		if not load(path, state, 0.0):
+			return False
+		# the file time stands in for the save time (for the worker's offline catch-up)
+		self.write(name, snapshot(state, 0.0, os.path.getmtime(path)))
+		return True
+
+	# index file: header + fixed-size records, updated in place
+
+	def _read_index(self):
+		try:
+			f = open(self.index_path, "rb")
+		except OSError:
+			return None
+		with f:
+			size = os.fstat(f.fileno()).st_size
+			if size < _INDEX_HEADER.size:
+				return None
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+				magic, version, record_size, count = _INDEX_HEADER.unpack_from(mm, 0)
+				if (
+					magic != INDEX_MAGIC or version != INDEX_VERSION or record_size != _INDEX_RECORD.size
+					or _INDEX_HEADER.size + count * record_size > size
+				):
+					return None
+				entries = []
+				for i in range(count):
+					raw_name, kind, unlocked, top, prestige, saved_at, currency = _INDEX_RECORD.unpack_from(
+						mm, _INDEX_HEADER.size + i * record_size)
+					try:
+						name = raw_name.rstrip(b"\0").decode("utf-8")
+					except UnicodeDecodeError:
+						return None
+					entries.append({
+						"name": name, "kind": kind, "unlocked_slots": unlocked, "top_coin": top,
+						"prestige_level": prestige, "saved_at": saved_at, "currency": int(currency),
+					})
+		return entries
+
+	def _pack(self, e):
+		return _INDEX_RECORD.pack(
+			e["name"].encode("utf-8"), e["kind"], min(e["unlocked_slots"], 0xFF), min(e["top_coin"], 0xFFFF),
+			min(e["prestige_level"], 0xFFFFFFFF), e["saved_at"], float(e["currency"]),
+		)
+
+	def _write_index(self, entries):
+		blob = _INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, _INDEX_RECORD.size, len(entries))
+		blob += b"".join(self._pack(e) for e in entries)
+		write_file_atomic(self.index_path, blob)
+
+	def _rebuild_index(self):
+		entries = []
+		try:
+			names = sorted(os.listdir(self.root))
+		except OSError:
+			names = []
+		for fname in names:
+			name = fname[:-4]
+			if not fname.endswith(".dat") or not self.valid_name(name):
+				continue
+			try:
+				with open(os.path.join(self.root, fname), "rb") as f:
+					snap = decode(f.read())
+			except (OSError, SaveError):
+				continue
+			kind = KIND_CHECKPOINT if "@" in name else KIND_PROFILE
+			entries.append(_preview(name, kind, snap))
+		if entries:
+			self._write_index(entries)
+		return entries
+
+	def _update_index(self, entry):
+		entries = self._read_index()
+		if entries is None:
+			entries = self._rebuild_index()
+		names = [e["name"] for e in entries]
+		if entry["name"] not in names:
+			if not os.path.exists(self.index_path):
+				entries.append(entry)
+				self._write_index(entries)
+				return
+			# new entry: write it right after the counted records (over any left
+			# by a write that died before bumping the count) and bump the count
+			with open(self.index_path, "r+b") as f:
+				f.seek(_INDEX_HEADER.size + len(entries) * _INDEX_RECORD.size)
+				f.write(self._pack(entry))
+				f.truncate()
+				f.seek(0)
+				f.write(_INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, _INDEX_RECORD.size, len(entries) + 1))
+			return
+		# existing entry: overwrite its record in place through the map
+		offset = _INDEX_HEADER.size + names.index(entry["name"]) * _INDEX_RECORD.size
+		with open(self.index_path, "r+b") as f:
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE) as mm:
+				mm[offset:offset + _INDEX_RECORD.size] = self._pack(entry)
@@ -0,0 +1,76 @@
+import random
+
+import actionlog
+from actionlog import (
+	Recorder, replay, apply, NewGame, Deal, ToggleWorker, BuyCoin, BuySlot, BuyWorker, BuyWorkerUpgrade,
+	BuyTimeThief, Sell, SellHighestAtHalf, TakeCoin, DropCoin, MarketTick, WorkerTick, RestartRun,
+)
+from engine import GameState
+
+
+def random_session(path, seed, commands=3000):
+	# random play recorded the way game.py records it; returns the final state
+	rng = random.Random(seed)
+	state = GameState(seed=seed)
+	recorder = Recorder(state, path, checkpoint_every=250)
+	now = 0.0
+
+	def dispatch(cmd):
+		result = apply(state, cmd)
+		recorder.record(cmd, result)
+		return result
+
+	recorder.checkpoint(now)
+	dispatch(NewGame(now))
+	# a rich start (not a command, so the checkpoint replaces the state, like a load)
+	state.currency = 10 ** 5
+	recorder.checkpoint(now)
+	for _ in range(commands):
+		now = round(now + rng.choice((0.01, 0.1, 0.5, 2.0)), 2)
+		dispatch(MarketTick(now))
+		dispatch(WorkerTick(now))
+		r = rng.random()
+		slot = rng.randrange(len(state.slots))
+		if r < 0.35:
+			dispatch(Deal(now))
+		elif r < 0.5:
+			dispatch(Sell(now, slot, rng.choice((1, 5, None)), None))
+		elif r < 0.65:
+			level = dispatch(TakeCoin(now, slot))
+			if level is not None:
+				target = rng.choice((None, rng.randrange(len(state.slots))))
+				dispatch(DropCoin(now, level, target, slot))
+		elif r < 0.75:
+			dispatch(BuyCoin(now, rng.choice(state.buy_levels())))
+		elif r < 0.8:
+			dispatch(BuySlot(now))
+		elif r < 0.85:
+			dispatch(rng.choice((BuyWorker, BuyWorkerUpgrade, BuyTimeThief, ToggleWorker))(now))
+		elif r < 0.87:
+			dispatch(SellHighestAtHalf(now))
+		elif r < 0.875:
+			dispatch(RestartRun(now))
+	recorder.close()
+	return state
+
+
+def test_replay_matches_recorded_session(tmp_path):
+	# replay re-runs combines, deals and market pricing and checks them at every checkpoint
+	path = str(tmp_path / "session.cmlog")
+	state = random_session(path, seed=3)
+	replayed, stats = replay(path)
+	assert stats["checkpoints"] > 5
+	for key in actionlog._CHECKED:
+		if key != "slots":
+			assert getattr(replayed, key) == getattr(state, key), key
+	assert [(s.coin, s.count) for s in replayed.slots] == [(s.coin, s.count) for s in state.slots]
+	assert replayed.rng.getstate() == state.rng.getstate()
+
+
+def test_truncated_log_replays_its_complete_records(tmp_path):
+	path = tmp_path / "session.cmlog"
+	random_session(str(path), seed=4, commands=500)
+	data = path.read_bytes()
+	path.write_bytes(data[:len(data) - 3])
+	_, stats = replay(str(path))
+	assert stats["commands"] > 0
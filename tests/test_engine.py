@@ -0,0 +1,257 @@
+"""Seeded checks of the engine's optimized paths against plain reference versions.
+
+The reference functions are the straightforward scans the engine started
+with (the rescan-until-stable combine cascade, the uncached spawn odds
+and the list-backed market windows); every optimized path must give the
+same results.
+"""
+import random
+
+import pytest
+
+from engine import (
+	GameState, Slot, MarketLevel, SLOT_CAPACITY, DEAL_WEIGHT_DECAY, SELL_IMPACT_MULTIPLIER,
+	MARKET_HISTORY_LEN, MARKET_PRICE_SAMPLES, MARKET_LOOKBACK, MARKET_IDLE_EVICT, add_coin_to_slots, process_combines,
+	compute_spawn_probabilities, weighted_random_coin, coin_value, slot_index,
+)
+
+
+# --- reference implementations ---
+
+class RefSlot:
+	def __init__(self, coin=0, count=0):
+		self.coin = coin
+		self.count = count
+
+	def is_empty(self):
+		return self.coin == 0
+
+
+def ref_add_coin(slots, level):
+	for s in slots:
+		if s.coin == level and s.count < SLOT_CAPACITY:
+			s.count += 1
+			return True
+	for s in slots:
+		if s.is_empty():
+			s.coin = level
+			s.count = 1
+			return True
+	return False
+
+
+def ref_process_combines(slots, currency, prestige_mult):
+	# rescan the whole board until nothing promotes
+	gained = 0
+	promoted_any = True
+	while promoted_any:
+		promoted_any = False
+		for s in slots:
+			if s.is_empty() or s.count < SLOT_CAPACITY:
+				continue
+			promos = s.count // SLOT_CAPACITY
+			s.count = s.count % SLOT_CAPACITY
+			for _ in range(promos):
+				target_level = s.coin + 1
+				if not ref_add_coin(slots, target_level):
+					s.coin = target_level
+					s.count = 1
+				gained += coin_value(target_level)
+				promoted_any = True
+			if s.count == 0:
+				s.coin = 0
+	gained = int(gained * prestige_mult)
+	return currency + gained, gained
+
+
+def ref_can_place(slots, level):
+	return any(s.is_empty() or (s.coin == level and s.count < SLOT_CAPACITY) for s in slots)
+
+
+def ref_spawn_probabilities(slots, cap):
+	present = {s.coin for s in slots if s.coin}
+	candidates = sorted(present | set(range(1, min(3, cap) + 1)))
+	levels = [l for l in candidates if ref_can_place(slots, l)]
+	if not levels:
+		levels = [l for l in range(1, cap + 1) if ref_can_place(slots, l)][:1]
+		if not levels:
+			return {1: 100.0}
+	low = [l for l in levels if l <= 3]
+	high = [l for l in levels if l > 3]
+	weights = {l: 95.0 / len(low) for l in low}
+	if high:
+		raw = {l: DEAL_WEIGHT_DECAY ** (-(l - min(high))) for l in high}
+		total_raw = sum(raw.values())
+		weights.update({l: r / total_raw * 5.0 for l, r in raw.items()})
+	total = sum(weights.values())
+	return {l: w / total * 100.0 for l, w in weights.items()}
+
+
+def ref_market(records, level, now):
+	# (base price, weighted sales in the demand window) from the kept (price, time, weight) records
+	kept = records[-MARKET_HISTORY_LEN:]
+	units = [int(p) for p, t, w in kept for _ in range(w)]
+	recent = [int(p) for p, t, w in kept if now - t <= MARKET_LOOKBACK * 2.0 for _ in range(w)]
+	if recent:
+		sample = recent[-MARKET_PRICE_SAMPLES:]
+		base = int(sum(sample) / len(sample))
+	elif units:
+		sample = units[-MARKET_PRICE_SAMPLES:]
+		base = int(0.4 * int(sum(sample) / len(sample)) + 0.6 * coin_value(level))
+	else:
+		base = coin_value(level)
+	volume = sum(w for p, t, w in kept if now - t <= MARKET_LOOKBACK)
+	return base, volume
+
+
+# --- boards ---
+
+def random_board(rng, n, max_level=8):
+	# (coin, count) pairs: some empty slots, some full or over capacity
+	board = []
+	for _ in range(n):
+		if rng.random() < 0.2:
+			board.append((0, 0))
+		else:
+			board.append((rng.randint(1, max_level), rng.randint(1, SLOT_CAPACITY + 2)))
+	return board
+
+
+def make_slots(board):
+	slots = [Slot() for _ in board]
+	slot_index(slots)
+	for s, (coin, count) in zip(slots, board):
+		s.coin = coin
+		s.count = count
+	return slots
+
+
+def contents(slots):
+	return [(s.coin, s.count) for s in slots]
+
+
+# --- combines ---
+
+@pytest.mark.parametrize("seed", range(10))
+def test_combines_match_reference(seed):
+	rng = random.Random(seed)
+	for _ in range(100):
+		board = random_board(rng, rng.randint(1, 18))
+		slots = make_slots(board)
+		ref = [RefSlot(*b) for b in board]
+		level = rng.randint(1, 8)
+		assert add_coin_to_slots(slots, level) == ref_add_coin(ref, level)
+		currency = rng.randint(0, 10000)
+		mult = rng.choice((1.0, 1.3))
+		assert process_combines(slots, currency, mult) == ref_process_combines(ref, currency, mult)
+		assert contents(slots) == contents(ref)
+
+
+def test_full_cascade_promotes_all_the_way_up():
+	# C1..C17 one short of full, plus a full C1 stack
+	slots = make_slots([(lvl, SLOT_CAPACITY - 1) for lvl in range(1, 18)] + [(1, SLOT_CAPACITY)])
+	ref = [RefSlot(s.coin, s.count) for s in slots]
+	assert process_combines(slots, 0, 1.0) == ref_process_combines(ref, 0, 1.0)
+	assert contents(slots) == contents(ref)
+	assert max(s.coin for s in slots) == 18
+
+
+def test_slot_index_follows_setters():
+	rng = random.Random(7)
+	slots = make_slots(random_board(rng, 18))
+	index = slot_index(slots)
+	for _ in range(3000):
+		s = rng.choice(slots)
+		if rng.random() < 0.5:
+			s.coin = rng.choice((0, rng.randint(1, 8)))
+			s.count = 0 if s.coin == 0 else rng.randint(1, SLOT_CAPACITY + 1)
+		else:
+			s.count = rng.randint(0, SLOT_CAPACITY + 1)
+		assert slot_index(slots) is index
+		for level in range(1, 10):
+			first = next((i for i, t in enumerate(slots) if t.coin == level and t.count < SLOT_CAPACITY), None)
+			assert index.first_open(level) == first
+			assert index.can_place(level) == ref_can_place(slots, level)
+			assert index.level_count.get(level, 0) == sum(t.count for t in slots if t.coin == level)
+		assert index.first_empty() == next((i for i, t in enumerate(slots) if t.is_empty()), None)
+		assert index.max_level == max(t.coin for t in slots)
+
+
+# --- spawning ---
+
+@pytest.mark.parametrize("seed", range(5))
+def test_spawn_probabilities_match_reference(seed):
+	rng = random.Random(seed)
+	for _ in range(100):
+		slots = make_slots(random_board(rng, rng.randint(1, 18), max_level=rng.choice((3, 8, 14))))
+		for _ in range(5):
+			cap = rng.randint(1, 20)
+			probs = compute_spawn_probabilities(slots, cap=cap)
+			expected = ref_spawn_probabilities(slots, cap)
+			assert probs.keys() == expected.keys()
+			for level, p in expected.items():
+				assert probs[level] == pytest.approx(p)
+			drawn = weighted_random_coin(slots, cap=cap, rng=rng)
+			assert expected.get(drawn, 0.0) > 0.0
+			# change the board so the next round has to notice (cache invalidation)
+			s = rng.choice(slots)
+			s.coin = rng.randint(0, 9)
+			s.count = 0 if s.coin == 0 else rng.randint(1, SLOT_CAPACITY)
+
+
+# --- market ---
+
+@pytest.mark.parametrize("seed", range(8))
+def test_market_level_matches_reference(seed):
+	rng = random.Random(seed)
+	level = rng.randint(1, 12)
+	market = MarketLevel()
+	records = []
+	now = 0.0
+	for step in range(2500):
+		now += rng.choice((0.01, 0.5, 3.0, 40.0)) * rng.random()
+		if rng.random() < 0.8:
+			price = rng.uniform(1.0, 2.0 * coin_value(level))
+			weight = rng.randint(1, 5) * SELL_IMPACT_MULTIPLIER
+			market.add(price, now, weight)
+			records.append((price, now, weight))
+		if step % 25 == 0:
+			market.expire(now)
+			assert (market.base_price(level), market.recent_count()) == ref_market(records, level, now)
+
+
+def test_idle_levels_leave_the_chart_but_keep_their_prices():
+	state = GameState(seed=1)
+	state.record_sale(6, 5000, 0.0, count=5)
+	state.update_market_prices(1.0)
+	assert len(state.price_history[6]) == 1
+	now = 1.0 + MARKET_IDLE_EVICT
+	state.update_market_prices(now)
+	assert 6 not in state.price_history
+	# still priced from its old sales (demand 1.2 with no recent volume), not reset to coin_value
+	base, volume = ref_market([(5000, 0.0, 5 * SELL_IMPACT_MULTIPLIER)], 6, now)
+	assert base != coin_value(6) and volume == 0
+	assert state.price_of(6) == pytest.approx(base * 1.2, rel=0.03)
+
+
+# --- offline catch-up ---
+
+@pytest.mark.parametrize("seed", range(3))
+def test_fast_forward_matches_worker_deals(seed):
+	states = []
+	for _ in range(2):
+		state = GameState(seed=seed)
+		state.unlocked_slots = 12
+		state.slots = [Slot() for _ in range(12)]
+		state.worker_owned = state.worker_enabled = True
+		states.append(state)
+	batched, stepped = states
+	interval = batched.worker_interval()
+	assert batched.fast_forward_worker(interval * 300.5, max_deals=200) == 200
+	assert batched.last_catchup == (200, 100)
+	# the skipped deals' time is used up too: the next live deal is a full interval away
+	assert batched.worker_last_deal_time == pytest.approx(interval * 300)
+	for _ in range(200):
+		stepped.deal(combine_each=True)
+	assert contents(batched.slots) == contents(stepped.slots)
+	assert batched.rng.getstate() == stepped.rng.getstate()
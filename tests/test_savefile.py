@@ -0,0 +1,100 @@
+import json
+import random
+
+import pytest
+
+import savefile
+from balance import Agent
+from engine import GameState, Simulator
+from savefile import SaveError
+
+
+def played_state(seed, seconds=600.0):
+	# a board with sales, prices, chart history and upgrades
+	sim = Simulator(seed=seed)
+	agent = Agent(sim, target_slots=99)
+	while sim.now < seconds:
+		agent.step()
+		sim.run(agent.wait())
+	return sim.state, sim.now
+
+
+@pytest.mark.parametrize("compress", (True, False))
+def test_binary_round_trip(compress):
+	state, now = played_state("save/1")
+	assert state.market_sales and state.price_history
+	snap = savefile.snapshot(state, now, 1.7e9)
+	assert savefile.decode(savefile.encode(snap, compress=compress)) == snap
+	loaded = savefile.restore(GameState(), savefile.decode(savefile.encode(snap)), now)
+	assert savefile.snapshot(loaded, now, 1.7e9) == snap
+
+
+def test_restore_shifts_times_onto_the_new_clock():
+	state, now = played_state("save/2", seconds=120.0)
+	snap = savefile.snapshot(state, now, 1.7e9)
+	loaded = savefile.restore(GameState(), snap, now + 500.0)
+	assert loaded.last_deal_time == pytest.approx(state.last_deal_time + 500.0)
+	assert loaded.last_price_update == pytest.approx(state.last_price_update + 500.0)
+	for lvl, market in loaded.market_sales.items():
+		assert market.last_time() == pytest.approx(state.market_sales[lvl].last_time() + 500.0)
+
+
+def test_load_v0_json(tmp_path):
+	state, now = played_state("save/3", seconds=120.0)
+	path = tmp_path / "save.json"
+	path.write_text(json.dumps(state.to_save_data()))
+	loaded = GameState()
+	assert savefile.load(str(path), loaded, 0.0)
+	for key in ("unlocked_slots", "currency", "prestige_level", "worker_owned", "worker_enabled", "worker_upgraded", "time_thief_count"):
+		assert getattr(loaded, key) == getattr(state, key)
+	assert [(s.coin, s.count) for s in loaded.slots] == [(s.coin, s.count) for s in state.slots]
+
+
+def test_load_file_round_trip(tmp_path):
+	state, now = played_state("save/4", seconds=60.0)
+	path = str(tmp_path / "save.dat")
+	savefile.write(path, savefile.snapshot(state, now, 1.7e9))
+	loaded = GameState()
+	assert savefile.load(path, loaded, now)
+	assert loaded.currency == state.currency
+	assert not savefile.load(str(tmp_path / "missing.dat"), GameState(), 0.0)
+
+
+def test_decode_rejects_bad_blobs():
+	blob = savefile.encode(savefile.snapshot(GameState(seed=1), 0.0, 0.0))
+	with pytest.raises(SaveError):
+		savefile.decode(b"XXXX" + blob[4:])
+	with pytest.raises(SaveError):
+		savefile.decode(blob[:4] + (99).to_bytes(2, "little") + blob[6:])
+	with pytest.raises(SaveError):
+		savefile.decode(blob[:len(blob) // 2])
+	raw = savefile.encode(savefile.snapshot(GameState(seed=1), 0.0, 0.0), compress=False)
+	with pytest.raises(SaveError):
+		savefile.decode(raw[:len(raw) // 2])
+
+
+def test_store_index_survives_rebuild(tmp_path):
+	store = savefile.SaveStore(str(tmp_path))
+	rng = random.Random(5)
+	for i in range(12):
+		state = GameState(seed=i)
+		state.currency = rng.randint(0, 10 ** 6)
+		store.write(f"p{i % 5}", savefile.snapshot(state, 0.0, 1000.0 + i))
+	entries = store.entries()
+	assert sorted(e["name"] for e in entries) == [f"p{i}" for i in range(5)]
+	(tmp_path / "index.bin").write_bytes(b"junk")
+	assert store.entries() == entries
+
+
+def test_store_index_appends_over_uncounted_records(tmp_path):
+	# a crash between writing a new record and bumping the count leaves an orphan at the end
+	store = savefile.SaveStore(str(tmp_path))
+	for i, name in enumerate(("a", "b")):
+		store.write(name, savefile.snapshot(GameState(seed=i), 0.0, 1000.0 + i))
+	index = tmp_path / "index.bin"
+	size = index.stat().st_size
+	with open(index, "ab") as f:
+		f.write(b"\xff" * 100)
+	store.write("c", savefile.snapshot(GameState(seed=2), 0.0, 2000.0))
+	assert index.stat().st_size == size + savefile._INDEX_RECORD.size
+	assert [e["name"] for e in store.entries()] == ["c", "b", "a"]